@@ -1,10 +1,12 @@
 import pygame
 import sys
-import random
 import math
+import random
+import argparse
 
-# 初始化Pygame
-pygame.init()
+from snake_core import SnakeEngine, UP, DOWN, LEFT, RIGHT
+from snake_autopilot import Autopilot
+from snake_replay import Replay, ReplayError, ReplayPlayer, ReplayRecorder
 
 # 游戏常量
 SCREEN_WIDTH = 800
@@ -12,6 +14,8 @@ SCREEN_HEIGHT = 600
 GRID_SIZE = 20
 GRID_WIDTH = SCREEN_WIDTH // GRID_SIZE
 GRID_HEIGHT = SCREEN_HEIGHT // GRID_SIZE
+RENDER_FPS = 30  # 默认渲染帧率，与蛇的移动速度无关
+MAX_FRAME_TIME = 250  # 毫秒，单帧最多补这么多时间，避免暂停或卡顿后一次补太多步
 
 # 颜色定义 (红白机风格)
 BACKGROUND = (0, 0, 170)  # 深蓝色背景
@@ -22,138 +26,278 @@ FOOD_COLOR = (255, 0, 0)  # 红色食物
 TEXT_COLOR = (255, 255, 255)  # 白色文字
 GAME_OVER_BG = (0, 0, 0, 180)  # 半透明黑色游戏结束背景
 
-# 创建屏幕
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("红白机风格贪吃蛇")
-clock = pygame.time.Clock()
+# 屏幕、时钟和字体在 init_display() 中创建，导入本模块不会打开窗口
+screen = None
+clock = None
+font = None
+small_font = None
 
-# 字体设置
-font = pygame.font.Font(None, 36)
-small_font = pygame.font.Font(None, 24)
+def init_display():
+    global screen, clock, font, small_font
+    # 只初始化用到的显示和字体子系统，不初始化 mixer、手柄等
+    pygame.display.init()
+    pygame.font.init()
+    
+    # 创建屏幕
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("红白机风格贪吃蛇")
+    clock = pygame.time.Clock()
+    
+    # 字体设置
+    font = pygame.font.Font(None, 36)
+    small_font = pygame.font.Font(None, 24)
 
 class Snake:
-    def __init__(self):
-        self.reset()
+    # pygame 前端：游戏逻辑全部委托给 SnakeEngine，这里只负责按真实时间推进和绘制
+    def __init__(self, game, autopilot=None, recorder=None, player=None):
+        self.game = game
+        self.autopilot = autopilot
+        self.recorder = recorder
+        self.player = player
+        self.last_time = None
+        self.accumulator = 0  # 尚未消耗的模拟时间（毫秒）
+        self.last_tail = None  # 最近一步空出的蛇尾格子，用于插值绘制蛇尾
         
     def reset(self):
-        self.length = 3
-        self.positions = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
-        self.direction = random.choice([(0, 1), (0, -1), (1, 0), (-1, 0)])
-        self.score = 0
-        self.grow_to = 3
-        self.last_move_time = 0
-        self.move_delay = 150  # 毫秒
+        if self.recorder is not None:
+            self.recorder.reset()
+        self.game.reset()
+        self.last_tail = None
+        self.reset_clock()
+    
+    @property
+    def positions(self):
+        return self.game.body
+    
+    @property
+    def direction(self):
+        return self.game.direction
+    
+    @property
+    def score(self):
+        return self.game.score
+    
+    @property
+    def move_delay(self):
+        return self.game.move_delay
         
     def get_head_position(self):
-        return self.positions[0]
+        return self.game.head
     
     def update(self, current_time):
-        if current_time - self.last_move_time > self.move_delay:
-            self.last_move_time = current_time
-            
-            head = self.get_head_position()
-            x, y = self.direction
-            new_x = (head[0] + x) % GRID_WIDTH
-            new_y = (head[1] + y) % GRID_HEIGHT
-            new_position = (new_x, new_y)
-            
-            # 检查是否撞到自己
-            if new_position in self.positions[1:]:
-                return False  # 游戏结束
-                
-            self.positions.insert(0, new_position)
-            
-            if len(self.positions) > self.grow_to:
-                self.positions.pop()
-                
-        return True  # 游戏继续
+        # 固定步长累加器：一帧内执行所有到期的逻辑步，移动速度不再受帧率限制
+        if self.last_time is None:
+            self.last_time = current_time
+        self.accumulator += min(current_time - self.last_time, MAX_FRAME_TIME)
+        self.last_time = current_time
+        
+        while self.accumulator >= self.move_delay and not self.game.done:
+            self.accumulator -= self.move_delay
+            if self.player is not None:
+                # 重放：把到期的录像事件应用到这一步之前
+                self.player.apply_due(self.game)
+                if self.player.finished:
+                    break
+            if self.autopilot is not None:
+                # 自动驾驶在每一步之前决定方向
+                direction = self.autopilot.decide()
+                if direction is not None:
+                    self.change_direction(direction)
+            tail = self.game.body.tail
+            self.game.step()
+            # 蛇变长或撞到自己时蛇尾不动，没有空出格子
+            self.last_tail = tail if self.game.body.tail != tail else None
+        return not self.game.done  # False 表示游戏结束
+    
+    def reset_clock(self):
+        # 暂停、游戏结束期间不累积模拟时间，恢复后重新开始计时
+        self.last_time = None
+        self.accumulator = 0
+    
+    def interpolation(self):
+        # 距离下一步的进度 (0~1)，用于平滑绘制蛇头
+        return min(self.accumulator / self.move_delay, 1.0)
     
     def change_direction(self, direction):
-        # 防止蛇反向移动
-        if (direction[0] * -1, direction[1] * -1) != self.direction:
-            self.direction = direction
+        old_direction = self.game.direction
+        self.game.change_direction(direction)
+        if self.recorder is not None:
+            self.recorder.direction(old_direction)
     
-    def grow(self):
-        self.grow_to += 1
-        self.score += 10
-        # 提高游戏速度
-        self.move_delay = max(50, self.move_delay - 2)
+    def draw(self, surface, alpha=None):
+        atlas = get_atlas()
+        positions = self.positions
+        head = positions[0]
+        tail = None
+        if alpha is not None and len(positions) > 1:
+            # 插值模式：蛇头从上一格（脖子）平滑滑向当前格，
+            # 蛇尾同时从上一步空出的格子滑向当前蛇尾，两端处在同一时刻，蛇的长度不变
+            head = lerp_cell(positions[1], head, alpha)
+            if self.last_tail is not None:
+                tail = lerp_cell(self.last_tail, positions[-1], alpha)
+        
+        # 整条蛇身一次批量 blit，蛇头最后单独绘制
+        image, area = atlas.image, atlas.body
+        it = iter(positions)
+        next(it)
+        surface.blits([(image, (x * GRID_SIZE, y * GRID_SIZE), area) for x, y in it], False)
+        if tail is not None:
+            self.draw_segment(surface, tail, False)
+        self.draw_segment(surface, head, True)
     
-    def draw(self, surface):
-        for i, p in enumerate(self.positions):
-            # 绘制蛇身
-            rect = pygame.Rect((p[0] * GRID_SIZE, p[1] * GRID_SIZE), (GRID_SIZE, GRID_SIZE))
-            if i == 0:  # 蛇头
-                pygame.draw.rect(surface, SNAKE_HEAD_COLOR, rect)
-                pygame.draw.rect(surface, (0, 100, 0), rect, 1)  # 边框
-            else:  # 蛇身
-                pygame.draw.rect(surface, SNAKE_COLOR, rect)
-                pygame.draw.rect(surface, (0, 150, 0), rect, 1)  # 边框
-                
-            # 在蛇头上画眼睛
-            if i == 0:
-                # 确定眼睛位置
-                eye_size = GRID_SIZE // 5
-                # 左眼
-                left_eye_x = p[0] * GRID_SIZE + GRID_SIZE // 3
-                left_eye_y = p[1] * GRID_SIZE + GRID_SIZE // 3
-                # 右眼
-                right_eye_x = p[0] * GRID_SIZE + 2 * GRID_SIZE // 3
-                right_eye_y = p[1] * GRID_SIZE + GRID_SIZE // 3
-                
-                # 根据方向调整眼睛位置
-                if self.direction == (1, 0):  # 右
-                    left_eye_x += GRID_SIZE // 6
-                    right_eye_x += GRID_SIZE // 6
-                elif self.direction == (-1, 0):  # 左
-                    left_eye_x -= GRID_SIZE // 6
-                    right_eye_x -= GRID_SIZE // 6
-                elif self.direction == (0, 1):  # 下
-                    left_eye_y += GRID_SIZE // 6
-                    right_eye_y += GRID_SIZE // 6
-                elif self.direction == (0, -1):  # 上
-                    left_eye_y -= GRID_SIZE // 6
-                    right_eye_y -= GRID_SIZE // 6
-                
-                pygame.draw.circle(surface, (0, 0, 0), (left_eye_x, left_eye_y), eye_size)
-                pygame.draw.circle(surface, (0, 0, 0), (right_eye_x, right_eye_y), eye_size)
+    def draw_segment(self, surface, p, is_head):
+        # 插值模式下蛇头坐标可以是小数
+        atlas = get_atlas()
+        area = atlas.heads[self.direction] if is_head else atlas.body
+        surface.blit(atlas.image, (round(p[0] * GRID_SIZE), round(p[1] * GRID_SIZE)), area)
+
+def lerp_cell(start, end, alpha):
+    # 相邻两格之间按 alpha 插值；穿过屏幕边缘（坐标回绕）时直接取终点
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    if abs(dx) + abs(dy) != 1:
+        return end
+    return (start[0] + dx * alpha, start[1] + dy * alpha)
 
 class Food:
-    def __init__(self):
-        self.position = (0, 0)
-        self.randomize_position()
-        
-    def randomize_position(self):
-        self.position = (random.randint(0, GRID_WIDTH - 1), random.randint(0, GRID_HEIGHT - 1))
+    # 食物位置由 SnakeEngine 从空闲格子池中生成
+    def __init__(self, game):
+        self.game = game
+    
+    @property
+    def position(self):
+        return self.game.food
     
     def draw(self, surface):
-        rect = pygame.Rect((self.position[0] * GRID_SIZE, self.position[1] * GRID_SIZE), (GRID_SIZE, GRID_SIZE))
-        pygame.draw.rect(surface, FOOD_COLOR, rect)
-        pygame.draw.rect(surface, (150, 0, 0), rect, 1)  # 边框
+        if self.position is None:
+            return
+        atlas = get_atlas()
+        surface.blit(atlas.image, (self.position[0] * GRID_SIZE, self.position[1] * GRID_SIZE), atlas.food)
+
+def render_segment(surface, rect, is_head, direction):
+    # 在 rect 处绘制一节蛇身，只在构建精灵图集时调用
+    if is_head:  # 蛇头
+        pygame.draw.rect(surface, SNAKE_HEAD_COLOR, rect)
+        pygame.draw.rect(surface, (0, 100, 0), rect, 1)  # 边框
+    else:  # 蛇身
+        pygame.draw.rect(surface, SNAKE_COLOR, rect)
+        pygame.draw.rect(surface, (0, 150, 0), rect, 1)  # 边框
         
-        # 在食物上画一个笑脸
-        center_x = self.position[0] * GRID_SIZE + GRID_SIZE // 2
-        center_y = self.position[1] * GRID_SIZE + GRID_SIZE // 2
-        radius = GRID_SIZE // 3
+    # 在蛇头上画眼睛
+    if is_head:
+        # 确定眼睛位置
+        eye_size = GRID_SIZE // 5
+        # 左眼
+        left_eye_x = rect.x + GRID_SIZE // 3
+        left_eye_y = rect.y + GRID_SIZE // 3
+        # 右眼
+        right_eye_x = rect.x + 2 * GRID_SIZE // 3
+        right_eye_y = rect.y + GRID_SIZE // 3
         
-        # 眼睛
-        eye_offset = GRID_SIZE // 6
-        pygame.draw.circle(surface, (0, 0, 0), (center_x - eye_offset, center_y - eye_offset//2), GRID_SIZE//10)
-        pygame.draw.circle(surface, (0, 0, 0), (center_x + eye_offset, center_y - eye_offset//2), GRID_SIZE//10)
+        # 根据方向调整眼睛位置
+        if direction == (1, 0):  # 右
+            left_eye_x += GRID_SIZE // 6
+            right_eye_x += GRID_SIZE // 6
+        elif direction == (-1, 0):  # 左
+            left_eye_x -= GRID_SIZE // 6
+            right_eye_x -= GRID_SIZE // 6
+        elif direction == (0, 1):  # 下
+            left_eye_y += GRID_SIZE // 6
+            right_eye_y += GRID_SIZE // 6
+        elif direction == (0, -1):  # 上
+            left_eye_y -= GRID_SIZE // 6
+            right_eye_y -= GRID_SIZE // 6
         
-        # 嘴巴
-        mouth_rect = pygame.Rect(center_x - radius//1.5, center_y + eye_offset//2, radius, radius//2)
-        pygame.draw.arc(surface, (0, 0, 0), mouth_rect, 0, math.pi, 2)
+        # 眼睛限制在蛇头格子内
+        clip = surface.get_clip()
+        surface.set_clip(rect.clip(clip))
+        pygame.draw.circle(surface, (0, 0, 0), (left_eye_x, left_eye_y), eye_size)
+        pygame.draw.circle(surface, (0, 0, 0), (right_eye_x, right_eye_y), eye_size)
+        surface.set_clip(clip)
+
+def render_food(surface, rect):
+    # 在 rect 处绘制食物，只在构建精灵图集时调用
+    pygame.draw.rect(surface, FOOD_COLOR, rect)
+    pygame.draw.rect(surface, (150, 0, 0), rect, 1)  # 边框
+    
+    # 在食物上画一个笑脸
+    center_x = rect.x + GRID_SIZE // 2
+    center_y = rect.y + GRID_SIZE // 2
+    radius = GRID_SIZE // 3
+    
+    # 眼睛
+    eye_offset = GRID_SIZE // 6
+    pygame.draw.circle(surface, (0, 0, 0), (center_x - eye_offset, center_y - eye_offset//2), GRID_SIZE//10)
+    pygame.draw.circle(surface, (0, 0, 0), (center_x + eye_offset, center_y - eye_offset//2), GRID_SIZE//10)
+    
+    # 嘴巴
+    mouth_rect = pygame.Rect(center_x - radius//1.5, center_y + eye_offset//2, radius, radius//2)
+    pygame.draw.arc(surface, (0, 0, 0), mouth_rect, 0, math.pi, 2)
+
+class SpriteAtlas:
+    # 精灵图集：启动时把四个方向的蛇头、蛇身和食物各绘制一次，之后每格只需一次 blit
+    def __init__(self, grid_size=GRID_SIZE):
+        self.image = pygame.Surface((grid_size * 6, grid_size)).convert()
+        self.image.fill(BACKGROUND)
+        self.heads = {}
+        for i, direction in enumerate((UP, DOWN, LEFT, RIGHT)):
+            area = pygame.Rect(i * grid_size, 0, grid_size, grid_size)
+            render_segment(self.image, area, True, direction)
+            self.heads[direction] = area
+        self.body = pygame.Rect(4 * grid_size, 0, grid_size, grid_size)
+        render_segment(self.image, self.body, False, None)
+        self.food = pygame.Rect(5 * grid_size, 0, grid_size, grid_size)
+        render_food(self.image, self.food)
+
+_atlas_cache = {}
 
-def draw_grid(surface):
-    for y in range(0, SCREEN_HEIGHT, GRID_SIZE):
-        for x in range(0, SCREEN_WIDTH, GRID_SIZE):
-            rect = pygame.Rect((x, y), (GRID_SIZE, GRID_SIZE))
+def get_atlas(grid_size=GRID_SIZE):
+    atlas = _atlas_cache.get(grid_size)
+    if atlas is None:
+        _atlas_cache.clear()
+        atlas = SpriteAtlas(grid_size)
+        _atlas_cache[grid_size] = atlas
+    return atlas
+
+def draw_grid(surface, grid_size=GRID_SIZE):
+    width, height = surface.get_size()
+    for y in range(0, height, grid_size):
+        for x in range(0, width, grid_size):
+            rect = pygame.Rect((x, y), (grid_size, grid_size))
             pygame.draw.rect(surface, GRID_COLOR, rect, 1)
 
+# 静态背景缓存：网格和标题卡片只在分辨率/格子大小变化时重建一次，每帧只需一次 blit
+_background_cache = {}
+_title_card_cache = {}
+
+def get_background(width=SCREEN_WIDTH, height=SCREEN_HEIGHT, grid_size=GRID_SIZE):
+    key = (width, height, grid_size)
+    background = _background_cache.get(key)
+    if background is None:
+        _background_cache.clear()
+        background = pygame.Surface((width, height)).convert()
+        background.fill(BACKGROUND)
+        draw_grid(background, grid_size)
+        _background_cache[key] = background
+    return background
+
+def get_title_card(width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+    key = (width, height)
+    card = _title_card_cache.get(key)
+    if card is None:
+        _title_card_cache.clear()
+        card = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
+        card.fill((0, 0, 0, 0))
+        draw_title(card)
+        _title_card_cache[key] = card
+    return card
+
 def draw_score(surface, score):
     score_text = font.render(f"得分: {score}", True, TEXT_COLOR)
-    surface.blit(score_text, (10, 10))
+    return surface.blit(score_text, (10, 10))
+
+def draw_pause(surface):
+    pause_text = font.render("游戏暂停", True, TEXT_COLOR)
+    surface.blit(pause_text, (SCREEN_WIDTH//2 - pause_text.get_width()//2, SCREEN_HEIGHT//2))
 
 def draw_game_over(surface, score):
     # 半透明覆盖层
@@ -171,12 +315,14 @@ def draw_game_over(surface, score):
     surface.blit(restart_text, (SCREEN_WIDTH//2 - restart_text.get_width()//2, SCREEN_HEIGHT//2 + 60))
 
 def draw_title(surface):
+    # 只在构建标题卡片缓存时调用一次
+    width = surface.get_width()
     title_font = pygame.font.Font(None, 72)
     title_text = title_font.render("贪吃蛇", True, TEXT_COLOR)
     subtitle_text = font.render("红白机风格", True, TEXT_COLOR)
     
-    surface.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 50))
-    surface.blit(subtitle_text, (SCREEN_WIDTH//2 - subtitle_text.get_width()//2, 130))
+    surface.blit(title_text, (width//2 - title_text.get_width()//2, 50))
+    surface.blit(subtitle_text, (width//2 - subtitle_text.get_width()//2, 130))
     
     # 绘制控制说明
     controls = [
@@ -188,26 +334,138 @@ def draw_title(surface):
     
     for i, text in enumerate(controls):
         ctrl_text = small_font.render(text, True, TEXT_COLOR)
-        surface.blit(ctrl_text, (SCREEN_WIDTH//2 - ctrl_text.get_width()//2, 200 + i*30))
+        surface.blit(ctrl_text, (width//2 - ctrl_text.get_width()//2, 200 + i*30))
+
+def draw_frame(surface, snake, food, paused, game_over, alpha=None):
+    # 完整重绘一帧
+    surface.blit(get_background(), (0, 0))
+    snake.draw(surface, alpha)
+    food.draw(surface)
+    draw_score(surface, snake.score)
+    
+    if paused:
+        # 绘制暂停文字
+        draw_pause(surface)
+    
+    if game_over:
+        draw_game_over(surface, snake.score)
 
-def main():
-    snake = Snake()
-    food = Food()
+class DirtyRenderer:
+    # 脏矩形渲染器：每帧只重绘变化的格子（新蛇头、旧蛇头、空出的蛇尾、食物、得分区域），
+    # 并只把这些矩形提交给 pygame.display.update(rects)
+    # 暂停/游戏结束覆盖层出现时退回完整重绘
+    def __init__(self, surface):
+        self.surface = surface
+        self.full_redraw = True
+        self.body = None
+        self.last_head = None
+        self.last_direction = None
+        self.last_food = None
+        self.last_score = None
+        self.score_rect = pygame.Rect(0, 0, 0, 0)
+    
+    def invalidate(self):
+        # 下一帧完整重绘（窗口内容丢失、暂停切换、重新开始时调用）
+        self.full_redraw = True
+    
+    def render(self, snake, food, paused, game_over):
+        overlay = paused or game_over
+        if overlay or self.full_redraw or snake.positions is not self.body:
+            draw_frame(self.surface, snake, food, paused, game_over)
+            pygame.display.update()
+            self.body = snake.positions
+            self.body.track_changes()
+            self.score_rect = font.render(f"得分: {snake.score}", True, TEXT_COLOR).get_rect(topleft=(10, 10))
+            self._remember(snake, food)
+            # 覆盖层消失后的第一帧也需要完整重绘
+            self.full_redraw = overlay
+            return
+        
+        body = self.body
+        cells = set(body.drain_changes())
+        head = body.head
+        if head != self.last_head or snake.direction != self.last_direction:
+            cells.add(head)
+            cells.add(self.last_head)
+        if food.position != self.last_food:
+            cells.add(self.last_food)
+            cells.add(food.position)
+        
+        cells = list(cells)
+        rects = [pygame.Rect(x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE) for x, y in cells]
+        score_dirty = snake.score != self.last_score or self.score_rect.collidelist(rects) != -1
+        if score_dirty:
+            # 得分文字是抗锯齿的，必须先还原它覆盖的所有格子再重新绘制
+            score_rect = self.score_rect.union(
+                font.render(f"得分: {snake.score}", True, TEXT_COLOR).get_rect(topleft=(10, 10)))
+            for y in range(score_rect.top // GRID_SIZE, (score_rect.bottom - 1) // GRID_SIZE + 1):
+                for x in range(score_rect.left // GRID_SIZE, (score_rect.right - 1) // GRID_SIZE + 1):
+                    if (x, y) not in cells:
+                        cells.append((x, y))
+                        rects.append(pygame.Rect(x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE))
+        
+        background = get_background()
+        for cell, rect in zip(cells, rects):
+            self.surface.blit(background, rect, rect)
+            if cell == head:
+                snake.draw_segment(self.surface, cell, True)
+            elif cell in body:
+                snake.draw_segment(self.surface, cell, False)
+            if cell == food.position:
+                food.draw(self.surface)
+        
+        if score_dirty:
+            self.score_rect = draw_score(self.surface, snake.score)
+        
+        pygame.display.update(rects)
+        self._remember(snake, food)
+    
+    def _remember(self, snake, food):
+        self.last_head = snake.positions.head
+        self.last_direction = snake.direction
+        self.last_food = food.position
+        self.last_score = snake.score
+
+def main(dirty_rects=False, autopilot=False, record=None, replay=None, fps=RENDER_FPS, smooth=False):
+    # 重放模式：引擎由录像的种子创建，方向和重开由录像驱动，忽略方向键和 R 键
+    player = None
+    if replay is not None:
+        player = ReplayPlayer(Replay.load(replay))
+        if (player.replay.width, player.replay.height) != (GRID_WIDTH, GRID_HEIGHT):
+            raise ReplayError(f"录像棋盘大小 {player.replay.width}x{player.replay.height} 与当前不一致")
+        game = player.new_engine()
+        autopilot = False
+    else:
+        seed = random.randrange(1 << 64)
+        game = SnakeEngine(GRID_WIDTH, GRID_HEIGHT, seed)
+    recorder = ReplayRecorder(game, seed) if record is not None and player is None else None
+    
+    init_display()
+    # 启动时构建精灵图集和静态背景
+    get_atlas()
+    get_background()
+    snake = Snake(game, Autopilot(game) if autopilot else None, recorder, player)
+    food = Food(game)
     game_over = False
     paused = False
     show_title = True
-    
-    # 确保食物不在蛇身上
-    while food.position in snake.positions:
-        food.randomize_position()
+    # 可选的脏矩形渲染模式（python Qwen3-Coder-Plus.py --dirty）
+    # 蛇头插值每帧都在移动，开启 --smooth 时使用完整重绘
+    renderer = DirtyRenderer(screen) if dirty_rects and not smooth else None
     
     while True:
         current_time = pygame.time.get_ticks()
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if recorder is not None:
+                    recorder.save(record)
                 pygame.quit()
                 sys.exit()
+            
+            if event.type == pygame.VIDEOEXPOSE and renderer is not None:
+                # 窗口被遮挡或恢复后屏幕内容不可信，只补脏矩形会留下残影
+                renderer.invalidate()
                 
             if event.type == pygame.KEYDOWN:
                 if show_title:
@@ -216,61 +474,68 @@ def main():
                     
                 if event.key == pygame.K_SPACE:
                     paused = not paused
+                    snake.reset_clock()
+                    if renderer is not None:
+                        renderer.invalidate()
+                    
+                if player is not None:
+                    continue
                     
                 if event.key == pygame.K_r:
                     snake.reset()
-                    food.randomize_position()
                     game_over = False
                     paused = False
+                    if renderer is not None:
+                        renderer.invalidate()
                     
                 if not game_over and not paused:
                     if event.key == pygame.K_UP:
-                        snake.change_direction((0, -1))
+                        snake.change_direction(UP)
                     elif event.key == pygame.K_DOWN:
-                        snake.change_direction((0, 1))
+                        snake.change_direction(DOWN)
                     elif event.key == pygame.K_LEFT:
-                        snake.change_direction((-1, 0))
+                        snake.change_direction(LEFT)
                     elif event.key == pygame.K_RIGHT:
-                        snake.change_direction((1, 0))
+                        snake.change_direction(RIGHT)
         
         if show_title:
-            screen.fill(BACKGROUND)
-            draw_grid(screen)
-            draw_title(screen)
+            screen.blit(get_background(), (0, 0))
+            screen.blit(get_title_card(), (0, 0))
             pygame.display.update()
             clock.tick(10)
             continue
             
+        if player is not None and not paused:
+            if player.apply_due(game):
+                game_over = False
+                snake.reset_clock()
+            if player.finished:
+                game_over = True
+        
         if not paused and not game_over:
-            # 更新蛇的位置
+            # 更新蛇的位置（吃食物和生成新食物都在引擎中完成）
             if not snake.update(current_time):
                 game_over = True
-                
-            # 检查是否吃到食物
-            if snake.get_head_position() == food.position:
-                snake.grow()
-                food.randomize_position()
-                # 确保食物不在蛇身上
-                while food.position in snake.positions:
-                    food.randomize_position()
+            elif player is not None and player.finished:
+                game_over = True
         
         # 绘制游戏画面
-        screen.fill(BACKGROUND)
-        draw_grid(screen)
-        snake.draw(screen)
-        food.draw(screen)
-        draw_score(screen, snake.score)
-        
-        if paused:
-            # 绘制暂停文字
-            pause_text = font.render("游戏暂停", True, TEXT_COLOR)
-            screen.blit(pause_text, (SCREEN_WIDTH//2 - pause_text.get_width()//2, SCREEN_HEIGHT//2))
-        
-        if game_over:
-            draw_game_over(screen, snake.score)
-        
-        pygame.display.update()
-        clock.tick(30)
+        if renderer is not None:
+            renderer.render(snake, food, paused, game_over)
+        else:
+            alpha = snake.interpolation() if smooth and not paused and not game_over else None
+            draw_frame(screen, snake, food, paused, game_over, alpha)
+            pygame.display.update()
+        clock.tick(fps)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="红白机风格贪吃蛇")
+    parser.add_argument("--dirty", action="store_true", help="脏矩形渲染模式")
+    parser.add_argument("--autopilot", action="store_true", help="自动驾驶")
+    parser.add_argument("--record", metavar="FILE", help="退出时把本次游戏保存为录像")
+    parser.add_argument("--replay", metavar="FILE", help="按真实速度重放录像")
+    parser.add_argument("--fps", type=int, default=RENDER_FPS, help="渲染帧率，例如 60/120/144")
+    parser.add_argument("--smooth", action="store_true", help="在两步之间插值绘制蛇头")
+    args = parser.parse_args()
+    main(dirty_rects=args.dirty, autopilot=args.autopilot, record=args.record, replay=args.replay,
+         fps=args.fps, smooth=args.smooth)
@@ -0,0 +1,307 @@
+# snake_autopilot.py
+# 贪吃蛇自动驾驶：沿到食物的距离场前进，走之前检查蛇尾是否仍可达，
+# 不安全时沿哈密顿回路或选择最大的安全空间；每次决策有时间预算
+
+import time
+from collections import deque
+
+from snake_core import DIRECTIONS
+
+INF = 1 << 30
+
+# 单次失效传播超过这么多格子时放弃增量修复，改为分时间片整体重建
+INVALIDATE_LIMIT = 2048
+
+
+def torus_neighbors(width, height):
+    # 环形棋盘上每个格子的四个邻居（顺序与 DIRECTIONS 相同）
+    neighbors = []
+    for y in range(height):
+        for x in range(width):
+            neighbors.append(tuple(((y + dy) % height) * width + (x + dx) % width
+                                   for dx, dy in DIRECTIONS))
+    return neighbors
+
+
+def _cycle_order(width, height):
+    # height 为偶数时的回路：第 0 行从左到右，之后各行在第 1..W-1 列之间来回，
+    # 最后沿第 0 列回到起点
+    order = [(x, 0) for x in range(width)]
+    for y in range(1, height):
+        xs = range(width - 1, 0, -1) if y % 2 else range(1, width)
+        order.extend((x, y) for x in xs)
+    order.extend((0, y) for y in range(height - 1, 0, -1))
+    return order
+
+
+def hamiltonian_cycle(width, height):
+    # 返回 next_cell 列表：沿回路的下一个格子；宽高都是奇数时不存在这种简单回路，返回 None
+    if width < 2 or height < 2:
+        return None
+    if height % 2 == 0:
+        order = _cycle_order(width, height)
+    elif width % 2 == 0:
+        order = [(x, y) for y, x in _cycle_order(height, width)]
+    else:
+        return None
+    cells = [y * width + x for x, y in order]
+    next_cell = [0] * (width * height)
+    for i, cell in enumerate(cells):
+        next_cell[cell] = cells[(i + 1) % len(cells)]
+    return next_cell
+
+
+class DistanceField:
+    # 到食物的 BFS 距离场，蛇身格子是障碍
+    # 蛇头占用/蛇尾释放时只修复受影响的区域，只有食物移动时才整体重建
+    # 修复用 Dial 桶队列实现，可以按时间片分段执行
+    def __init__(self, neighbors):
+        self.neighbors = neighbors
+        self.size = len(neighbors)
+        self.dist = [INF] * self.size
+        self.blocked = bytearray(self.size)
+        self.source = None
+        self.buckets = []
+        self.cursor = 0
+        self.pending = 0
+
+    def _push(self, cell, d):
+        buckets = self.buckets
+        while len(buckets) <= d:
+            buckets.append([])
+        buckets[d].append(cell)
+        self.pending += 1
+        if d < self.cursor:
+            self.cursor = d
+
+    def rebuild(self, source, occupied):
+        self.dist = [INF] * self.size
+        self.blocked = bytearray(occupied)
+        self.source = source
+        self.buckets = []
+        self.cursor = 0
+        self.pending = 0
+        if not self.blocked[source]:
+            self._push(source, 0)
+
+    def block(self, cell):
+        if self.blocked[cell]:
+            return
+        self.blocked[cell] = 1
+        dist = self.dist
+        neighbors = self.neighbors
+        old = dist[cell]
+        dist[cell] = INF
+        if old == INF:
+            return
+        # 失效传播：找出只能经由 cell 到达食物的格子
+        stack = [n for n in neighbors[cell] if dist[n] == old + 1]
+        invalid = []
+        while stack:
+            u = stack.pop()
+            du = dist[u]
+            if du == INF or u == self.source:
+                continue
+            if any(dist[v] == du - 1 for v in neighbors[u]):
+                continue  # 还有其他邻居支撑这个距离
+            dist[u] = INF
+            invalid.append(u)
+            if len(invalid) > INVALIDATE_LIMIT:
+                self.rebuild(self.source, self.blocked)
+                return
+            stack.extend(n for n in neighbors[u] if dist[n] == du + 1)
+        # 从仍然有效的邻居重新计算失效区域
+        for u in invalid:
+            best = min(dist[v] for v in neighbors[u])
+            if best != INF:
+                self._push(u, best + 1)
+
+    def free(self, cell):
+        if not self.blocked[cell]:
+            return
+        self.blocked[cell] = 0
+        if cell == self.source:
+            self._push(cell, 0)
+            return
+        best = min(self.dist[v] for v in self.neighbors[cell])
+        if best != INF:
+            self._push(cell, best + 1)
+
+    def relax(self, deadline):
+        # 处理待确认的格子直到队列为空或超过截止时间；返回距离场是否已完整
+        dist = self.dist
+        blocked = self.blocked
+        neighbors = self.neighbors
+        buckets = self.buckets
+        source = self.source
+        count = 0
+        while self.pending:
+            while not buckets[self.cursor]:
+                self.cursor += 1
+            d = self.cursor
+            bucket = buckets[d]
+            u = bucket.pop()
+            self.pending -= 1
+            count += 1
+            if count & 255 == 0 and time.perf_counter() > deadline:
+                bucket.append(u)
+                self.pending += 1
+                return False
+            if blocked[u] or d >= dist[u]:
+                continue
+            # 过期条目：支撑它的邻居可能已经失效，改从当前最近的邻居重新排队
+            if d == 0:
+                if u != source:
+                    continue
+            elif not any(dist[v] == d - 1 for v in neighbors[u]):
+                best = min(dist[v] for v in neighbors[u])
+                if best != INF:
+                    self._push(u, best + 1)
+                continue
+            dist[u] = d
+            for n in neighbors[u]:
+                if not blocked[n] and dist[n] > d + 1:
+                    self._push(n, d + 1)
+        return True
+
+
+class Autopilot:
+    # 驱动 Snake.change_direction 的自动驾驶，engine 为 SnakeEngine
+    def __init__(self, engine, budget_ms=10.0):
+        self.engine = engine
+        self.width = engine.width
+        self.height = engine.height
+        self.budget = budget_ms / 1000.0
+        self.neighbors = torus_neighbors(self.width, self.height)
+        self.cycle = hamiltonian_cycle(self.width, self.height)
+        self.field = DistanceField(self.neighbors)
+        self.body = None
+        self.mirror = deque()
+        self.food = None
+        # 延迟统计
+        self.decisions = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.overruns = 0
+
+    def _index(self, pos):
+        return pos[1] * self.width + pos[0]
+
+    def _sync(self):
+        # 把自上次决策以来蛇身的变化（新蛇头、移除的蛇尾）增量地应用到距离场
+        engine = self.engine
+        body = engine.body
+        food = None if engine.food is None else self._index(engine.food)
+        if body is not self.body:
+            self.body = body
+            self.mirror = deque(self._index(p) for p in body)
+            self.food = None
+        else:
+            # 食物移动时距离场整体重建，不需要再做增量修复
+            rebuild = food != self.food
+            mirror = self.mirror
+            new_heads = []
+            last_head = mirror[0]
+            for pos in body:
+                cell = self._index(pos)
+                if cell == last_head:
+                    break
+                new_heads.append(cell)
+            for cell in reversed(new_heads):
+                mirror.appendleft(cell)
+            while len(mirror) > len(body):
+                cell = mirror.pop()
+                if not rebuild and not body.occupied[cell]:
+                    self.field.free(cell)
+            if not rebuild:
+                for cell in new_heads:
+                    self.field.block(cell)
+
+        if food != self.food:
+            self.food = food
+            if food is not None:
+                self.field.rebuild(food, body.occupied)
+
+    def _flood(self, start, deadline):
+        # 假设蛇头走到 start，检查新的蛇尾是否仍可达；空间足够容纳整条蛇也视为安全
+        # 返回 (安全, 可达面积)
+        engine = self.engine
+        body = engine.body
+        occupied = body.occupied
+        length = len(body)
+        moves_tail = length + 1 > engine.grow_to
+        if length == 1 or (length == 2 and moves_tail):
+            return True, INF
+        # 蛇尾移动时原蛇尾格子会空出来，新的蛇尾是倒数第二节
+        vacated = self._index(body[-1]) if moves_tail else -1
+        target = self._index(body[-2] if moves_tail else body[-1])
+        neighbors = self.neighbors
+        seen = {start}
+        stack = [start]
+        count = 0
+        while stack:
+            u = stack.pop()
+            for n in neighbors[u]:
+                if n == target:
+                    return True, len(seen)
+                if n in seen or (occupied[n] and n != vacated):
+                    continue
+                seen.add(n)
+                stack.append(n)
+            if len(seen) > length:
+                return True, len(seen)
+            count += 1
+            if count & 255 == 0 and time.perf_counter() > deadline:
+                break
+        return False, len(seen)
+
+    def decide(self):
+        start = time.perf_counter()
+        deadline = start + self.budget
+        self._sync()
+        # 距离场修复最多占用预算的 60%，剩下的留给安全检查
+        complete = self.field.relax(start + self.budget * 0.6)
+        direction = self._choose(complete, deadline)
+
+        elapsed = (time.perf_counter() - start) * 1000.0
+        self.decisions += 1
+        self.total_ms += elapsed
+        self.max_ms = max(self.max_ms, elapsed)
+        if elapsed > self.budget * 1000.0:
+            self.overruns += 1
+        return direction
+
+    def _choose(self, complete, deadline):
+        engine = self.engine
+        if engine.done or self.food is None:
+            return None
+        occupied = engine.body.occupied
+        head = self._index(engine.head)
+        reverse = (-engine.direction[0], -engine.direction[1])
+        legal = [(DIRECTIONS[i], n) for i, n in enumerate(self.neighbors[head])
+                 if not occupied[n] and DIRECTIONS[i] != reverse]
+        if not legal:
+            return None
+
+        # 1. 沿距离场下降到食物
+        if complete:
+            dist = self.field.dist
+            direction, cell = min(legal, key=lambda move: dist[move[1]])
+            if dist[cell] != INF and self._flood(cell, deadline)[0]:
+                return direction
+
+        # 2. 沿哈密顿回路前进
+        if self.cycle is not None:
+            nxt = self.cycle[head]
+            for direction, cell in legal:
+                if cell == nxt and self._flood(cell, deadline)[0]:
+                    return direction
+
+        # 3. 选择能到达蛇尾或可达空间最大的方向
+        best = None
+        best_key = None
+        for direction, cell in legal:
+            key = self._flood(cell, deadline)
+            if best_key is None or key > best_key:
+                best, best_key = direction, key
+        return best
@@ -0,0 +1,135 @@
+# snake_batch.py
+# 基于 NumPy 的批量贪吃蛇环境：N 个棋盘用数组保存，一次 step(actions) 同时推进全部棋盘
+# 规则与 SnakeEngine 一致（穿墙、增长、撞到自己结束），结束的棋盘自动重置
+
+import numpy as np
+
+from snake_core import DIRECTIONS, FOOD_SCORE
+
+# 方向编号与 snake_core.DIRECTIONS 相同：0 上、1 下、2 左、3 右
+DIR_DX = np.array([d[0] for d in DIRECTIONS], dtype=np.int32)
+DIR_DY = np.array([d[1] for d in DIRECTIONS], dtype=np.int32)
+OPPOSITE = np.array([DIRECTIONS.index((-d[0], -d[1])) for d in DIRECTIONS], dtype=np.int8)
+
+# 每个棋盘先随机尝试这么多个格子找空位，都失败再做精确抽样
+FOOD_TRIES = 16
+
+
+class BatchSnakeEnv:
+    def __init__(self, num_envs, width=40, height=30, seed=None):
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.rng = np.random.default_rng(seed)
+
+        n = num_envs
+        # 蛇身环形缓冲区：body[i, head_ptr[i]] 是蛇头，往前 length-1 个是蛇尾，保存扁平格子下标
+        self.body = np.zeros((n, self.cells), dtype=np.int32)
+        self.head_ptr = np.zeros(n, dtype=np.int32)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.occupied = np.zeros((n, self.cells), dtype=bool)
+        self.head_x = np.zeros(n, dtype=np.int32)
+        self.head_y = np.zeros(n, dtype=np.int32)
+        self.direction = np.zeros(n, dtype=np.int8)
+        self.food = np.zeros(n, dtype=np.int32)
+        self.grow_to = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.steps = np.zeros(n, dtype=np.int32)
+        # 上一局结束时的得分，自动重置前保存下来供统计使用
+        self.final_score = np.zeros(n, dtype=np.int32)
+        self._rows = np.arange(n)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        idx = self._rows if mask is None else np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+        cx, cy = self.width // 2, self.height // 2
+        center = cy * self.width + cx
+        self.occupied[idx] = False
+        self.occupied[idx, center] = True
+        self.head_ptr[idx] = 0
+        self.body[idx, 0] = center
+        self.length[idx] = 1
+        self.head_x[idx] = cx
+        self.head_y[idx] = cy
+        self.direction[idx] = self.rng.integers(0, len(DIRECTIONS), size=idx.size)
+        self.grow_to[idx] = 3
+        self.score[idx] = 0
+        self.steps[idx] = 0
+        self._spawn_food(idx)
+
+    def _spawn_food(self, idx):
+        # 为 idx 中的棋盘各生成一个不在蛇身上的食物，返回棋盘已满（无处放置）的掩码
+        full = np.zeros(idx.size, dtype=bool)
+        if idx.size == 0:
+            return full
+        candidates = self.rng.integers(0, self.cells, size=(idx.size, FOOD_TRIES))
+        free = ~self.occupied[idx[:, None], candidates]
+        found = free.any(axis=1)
+        first = free.argmax(axis=1)
+        self.food[idx[found]] = candidates[found, first[found]]
+
+        missing = idx[~found]
+        if missing.size:
+            # 棋盘接近填满时的精确抽样：给每个空格子一个随机权重取最大值
+            weights = self.rng.random((missing.size, self.cells))
+            weights[self.occupied[missing]] = -1.0
+            self.food[missing] = weights.argmax(axis=1)
+            full[~found] = weights.max(axis=1) < 0
+        return full
+
+    def step(self, actions=None):
+        # actions: 长度为 N 的方向编号数组，-1 表示保持当前方向；返回 (rewards, dones)
+        if actions is not None:
+            actions = np.asarray(actions, dtype=np.int8)
+            # 防止蛇反向移动
+            turn = (actions >= 0) & (actions != OPPOSITE[self.direction])
+            self.direction = np.where(turn, actions, self.direction)
+
+        rows = self._rows
+        nx = (self.head_x + DIR_DX[self.direction]) % self.width
+        ny = (self.head_y + DIR_DY[self.direction]) % self.height
+        new_cell = ny * self.width + nx
+        self.steps += 1
+
+        # 撞到自己（在弹出蛇尾之前检查，与 SnakeEngine 一致）
+        dones = self.occupied[rows, new_cell]
+        alive = ~dones
+        live = rows[alive]
+        cell = new_cell[alive]
+
+        # 推入新蛇头
+        ptr = (self.head_ptr[live] + 1) % self.cells
+        self.head_ptr[live] = ptr
+        self.body[live, ptr] = cell
+        self.occupied[live, cell] = True
+        self.length[live] += 1
+        self.head_x[live] = nx[alive]
+        self.head_y[live] = ny[alive]
+
+        # 超出目标长度的棋盘弹出蛇尾
+        trim = live[self.length[live] > self.grow_to[live]]
+        tail_ptr = (self.head_ptr[trim] - self.length[trim] + 1) % self.cells
+        self.occupied[trim, self.body[trim, tail_ptr]] = False
+        self.length[trim] -= 1
+
+        # 吃到食物
+        rewards = np.zeros(self.num_envs, dtype=np.int32)
+        ate = live[cell == self.food[live]]
+        self.grow_to[ate] += 1
+        self.score[ate] += FOOD_SCORE
+        rewards[ate] = FOOD_SCORE
+        dones[ate[self._spawn_food(ate)]] = True
+
+        # 自动重置已结束的棋盘
+        self.final_score[dones] = self.score[dones]
+        self.reset(dones)
+        return rewards, dones
+
+    def board_body(self, i):
+        # 按从蛇头到蛇尾的顺序返回第 i 个棋盘的蛇身坐标（调试/对照用）
+        ptrs = (self.head_ptr[i] - np.arange(self.length[i])) % self.cells
+        return [(int(c) % self.width, int(c) // self.width) for c in self.body[i, ptrs]]
@@ -0,0 +1,246 @@
+# snake_bench.py
+# 贪吃蛇性能基准测试（无需窗口）
+# 用法: python snake_bench.py food [--width 40 --height 30]
+#       python snake_bench.py engine [--games 5000]
+#       python snake_bench.py batch [--sizes 1 16 256 4096]（需要 NumPy）
+#       python snake_bench.py autopilot [--width 200 --height 200 --budget 10]
+#       python snake_bench.py startup [--repeat 5]（各模块导入耗时和游戏到第一帧的耗时）
+
+import argparse
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from snake_autopilot import Autopilot
+from snake_core import DIRECTIONS, SnakeBody, SnakeEngine
+
+FILL_RATIOS = (0.10, 0.50, 0.90, 0.99)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GAME_MODULE = "Qwen3-Coder-Plus"
+STARTUP_MODULES = ("snake_core", "snake_autopilot", "snake_replay", "snake_batch", GAME_MODULE)
+HEADLESS_ENV = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy",
+                    PYGAME_HIDE_SUPPORT_PROMPT="1")
+
+# import time:  自身(us) | 累计(us) | 缩进 + 模块名
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+# 与 test6-Super Mario/startup_bench.py 相同的探针：导入模块后打印已初始化的 Pygame 子系统（逗号分隔）
+IMPORT_PROBE = """
+import sys
+__import__(sys.argv[1])
+pygame = sys.modules.get("pygame")
+modules = (("pygame", pygame), ("display", pygame.display), ("font", pygame.font)) if pygame else ()
+print(",".join(name for name, module in modules if module.get_init()))
+"""
+
+# 以 __main__ 运行游戏，第一帧提交到屏幕时打印耗时（毫秒）并立即退出
+FIRST_FRAME_DRIVER = """
+import os, runpy, sys, time
+start = time.perf_counter()
+import pygame
+def first_frame(*args):
+    print((time.perf_counter() - start) * 1000, flush=True)
+    os._exit(0)
+pygame.display.flip = pygame.display.update = first_frame
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def _filled_body(width, height, ratio, rng):
+    # 随机占满指定比例的格子（基准测试只关心占用情况，不要求蛇身连续）
+    cells = [(x, y) for y in range(height) for x in range(width)]
+    rng.shuffle(cells)
+    count = min(int(width * height * ratio), width * height - 1)
+    return SnakeBody(width, height, cells[:count])
+
+
+def _spawn_rejection(body_list, width, height, rng):
+    # 原来的做法：整盘随机 + 列表扫描，直到落在空格子上
+    position = (rng.randint(0, width - 1), rng.randint(0, height - 1))
+    while position in body_list:
+        position = (rng.randint(0, width - 1), rng.randint(0, height - 1))
+    return position
+
+
+def bench_food(width, height, rounds, seed=0):
+    rng = random.Random(seed)
+    print(f"食物生成延迟 ({width}x{height}, 每档 {rounds} 次)")
+    print(f"{'占用率':>6} {'拒绝采样(us)':>14} {'空闲池(us)':>12} {'加速比':>8}")
+    for ratio in FILL_RATIOS:
+        body = _filled_body(width, height, ratio, rng)
+        body_list = list(body)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            _spawn_rejection(body_list, width, height, rng)
+        rejection = (time.perf_counter() - start) / rounds * 1e6
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            body.random_free_cell(rng)
+        pool = (time.perf_counter() - start) / rounds * 1e6
+
+        print(f"{ratio:>6.0%} {rejection:>14.2f} {pool:>12.2f} {rejection / pool:>7.0f}x")
+
+
+def bench_engine(width, height, games, seed=0):
+    # 无窗口、无真实时间地连续跑完整局游戏（随机策略）
+    rng = random.Random(seed)
+    engine = SnakeEngine(width, height, seed)
+    steps = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        engine.reset()
+        done = False
+        while not done:
+            _, done = engine.step(rng.choice(DIRECTIONS))
+        steps += engine.steps
+    elapsed = time.perf_counter() - start
+    print(f"无头引擎 ({width}x{height}, {games} 局随机策略)")
+    print(f"  {games / elapsed:,.0f} 局/秒, {steps / elapsed:,.0f} 步/秒, 平均 {steps / games:.1f} 步/局")
+
+
+def bench_batch(width, height, sizes, steps, seed=0):
+    # 批量环境吞吐量（总步数/秒）随棋盘数 N 的变化，对照逐个推进 SnakeEngine
+    import numpy as np
+    from snake_batch import BatchSnakeEnv
+
+    rng = np.random.default_rng(seed)
+    engine = SnakeEngine(width, height, seed)
+    start = time.perf_counter()
+    for action in rng.integers(0, len(DIRECTIONS), size=steps * 100):
+        _, done = engine.step(DIRECTIONS[action])
+        if done:
+            engine.reset()
+    single = steps * 100 / (time.perf_counter() - start)
+
+    print(f"批量环境吞吐量 ({width}x{height}, 每档 {steps} 次 step)")
+    print(f"  SnakeEngine 逐个推进: {single:>14,.0f} 步/秒")
+    print(f"{'N':>8} {'步/秒':>16} {'vs SnakeEngine':>16}")
+    for n in sizes:
+        env = BatchSnakeEnv(n, width, height, seed)
+        actions = rng.integers(-1, len(DIRECTIONS), size=(steps, n))
+        start = time.perf_counter()
+        for row in actions:
+            env.step(row)
+        rate = n * steps / (time.perf_counter() - start)
+        print(f"{n:>8} {rate:>16,.0f} {rate / single:>15.1f}x")
+
+
+def bench_autopilot(width, height, steps, budget_ms, seed=0):
+    # 自动驾驶浸泡测试：统计决策延迟和得分
+    engine = SnakeEngine(width, height, seed)
+    pilot = Autopilot(engine, budget_ms)
+    latencies = []
+    games = 0
+    best = 0
+    for _ in range(steps):
+        start = time.perf_counter()
+        action = pilot.decide()
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        _, done = engine.step(action)
+        if done:
+            games += 1
+            best = max(best, engine.score)
+            engine.reset()
+    best = max(best, engine.score)
+    latencies.sort()
+    print(f"自动驾驶 ({width}x{height}, {steps} 步, 预算 {budget_ms} ms)")
+    print(f"  延迟 p50 {latencies[len(latencies) // 2]:.3f} ms, "
+          f"p99 {latencies[len(latencies) * 99 // 100]:.3f} ms, 最大 {latencies[-1]:.3f} ms, "
+          f"超预算 {pilot.overruns} 次")
+    print(f"  结束 {games} 局, 最高得分 {best}")
+
+
+def _import_time(module):
+    # 在新进程中用 -X importtime 导入模块，返回 (累计耗时 ms, 导入后已初始化的子系统)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_PROBE, module],
+                            cwd=HERE, env=HEADLESS_ENV, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and match.group(4) == module:
+            return int(match.group(2)) / 1000, result.stdout.strip()
+    return 0.0, result.stdout.strip()
+
+
+def _first_frame():
+    # 无窗口地启动游戏，返回 (子进程内到第一帧的耗时, 包含解释器启动的总耗时)，单位为毫秒
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", FIRST_FRAME_DRIVER, GAME_MODULE + ".py"],
+                            cwd=HERE, env=HEADLESS_ENV, capture_output=True, text=True, timeout=60)
+    total = (time.perf_counter() - start) * 1000
+    if result.returncode != 0 or not result.stdout.strip():
+        raise RuntimeError("游戏没有画出第一帧")
+    return float(result.stdout.strip().splitlines()[-1]), total
+
+
+def bench_startup(repeat):
+    # 导入应当没有副作用：不初始化 Pygame、不打开窗口，无头工具和测试可以直接导入
+    print(f"模块导入耗时 (-X importtime, {repeat} 次取中位数)")
+    print(f"{'模块':<18} {'累计(ms)':>10}  导入后已初始化")
+    for module in STARTUP_MODULES:
+        try:
+            samples = [_import_time(module) for _ in range(repeat)]
+        except RuntimeError as error:
+            print(f"{module:<18} 失败: {error}")
+            continue
+        elapsed = statistics.median(sample[0] for sample in samples)
+        initialized = samples[-1][1] or "无"
+        print(f"{module:<18} {elapsed:>10.1f}  {initialized}")
+    frames = [_first_frame() for _ in range(repeat)]
+    print(f"{GAME_MODULE} 到第一帧: {statistics.median(f[0] for f in frames):.1f} ms "
+          f"(含解释器启动 {statistics.median(f[1] for f in frames):.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="贪吃蛇性能基准测试")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    food = sub.add_parser("food", help="食物生成延迟 vs 棋盘占用率")
+    food.add_argument("--width", type=int, default=40)
+    food.add_argument("--height", type=int, default=30)
+    food.add_argument("--rounds", type=int, default=200)
+
+    engine = sub.add_parser("engine", help="无头引擎吞吐量")
+    engine.add_argument("--width", type=int, default=40)
+    engine.add_argument("--height", type=int, default=30)
+    engine.add_argument("--games", type=int, default=5000)
+
+    batch = sub.add_parser("batch", help="NumPy 批量环境吞吐量 vs 棋盘数")
+    batch.add_argument("--width", type=int, default=40)
+    batch.add_argument("--height", type=int, default=30)
+    batch.add_argument("--sizes", type=int, nargs="+", default=[1, 16, 256, 4096])
+    batch.add_argument("--steps", type=int, default=200)
+
+    autopilot = sub.add_parser("autopilot", help="自动驾驶决策延迟浸泡测试")
+    autopilot.add_argument("--width", type=int, default=200)
+    autopilot.add_argument("--height", type=int, default=200)
+    autopilot.add_argument("--steps", type=int, default=5000)
+    autopilot.add_argument("--budget", type=float, default=10.0)
+
+    startup = sub.add_parser("startup", help="模块导入耗时和游戏到第一帧的耗时")
+    startup.add_argument("--repeat", type=int, default=5)
+
+    args = parser.parse_args()
+    if args.bench == "food":
+        bench_food(args.width, args.height, args.rounds)
+    elif args.bench == "engine":
+        bench_engine(args.width, args.height, args.games)
+    elif args.bench == "batch":
+        bench_batch(args.width, args.height, args.sizes, args.steps)
+    elif args.bench == "autopilot":
+        bench_autopilot(args.width, args.height, args.steps, args.budget)
+    elif args.bench == "startup":
+        bench_startup(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
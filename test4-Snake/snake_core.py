@@ -0,0 +1,205 @@
+# snake_core.py
+# 贪吃蛇的纯逻辑数据结构（不依赖 pygame）
+
+import random
+from collections import deque
+
+
+class FreeCells:
+    # 空闲格子池：cells 保存所有空闲格子的扁平下标，slot 是反向索引（-1 表示已占用）
+    # 占用/释放用 swap-remove 实现，随机抽取空格子是 O(1)，与棋盘填充率无关
+    def __init__(self, count):
+        self.cells = list(range(count))
+        self.slot = list(range(count))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, idx):
+        return self.slot[idx] >= 0
+
+    def take(self, idx):
+        i = self.slot[idx]
+        last = self.cells.pop()
+        if last != idx:
+            # 用最后一个元素填补空位
+            self.cells[i] = last
+            self.slot[last] = i
+        self.slot[idx] = -1
+
+    def put(self, idx):
+        self.slot[idx] = len(self.cells)
+        self.cells.append(idx)
+
+    def sample(self, rng=random):
+        return self.cells[rng.randrange(len(self.cells))]
+
+
+class SnakeBody:
+    # 蛇身存储：deque 保存顺序（下标 0 为蛇头），扁平位图记录每个格子是否被占用
+    # 移动、增长、自撞检测都是 O(1)，与蛇的长度无关
+    def __init__(self, width, height, positions=()):
+        self.width = width
+        self.height = height
+        self.cells = deque()
+        self.occupied = bytearray(width * height)
+        self.free = FreeCells(width * height)
+        # 变化日志：开启后记录每次蛇头新增/蛇尾移除的格子，供脏矩形渲染使用
+        self.changes = None
+        for pos in positions:
+            self.append_tail(pos)
+
+    def _index(self, pos):
+        return pos[1] * self.width + pos[0]
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def __getitem__(self, i):
+        # deque 两端取值是 O(1)，蛇头 [0] 和蛇尾 [-1] 最常用
+        return self.cells[i]
+
+    def __contains__(self, pos):
+        x, y = pos
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        return self.occupied[y * self.width + x] == 1
+
+    def __repr__(self):
+        return f"SnakeBody({list(self.cells)!r})"
+
+    @property
+    def head(self):
+        return self.cells[0]
+
+    @property
+    def tail(self):
+        return self.cells[-1]
+
+    def push_head(self, pos):
+        idx = self._index(pos)
+        self.cells.appendleft(pos)
+        self.occupied[idx] = 1
+        self.free.take(idx)
+        if self.changes is not None:
+            self.changes.append(pos)
+
+    def append_tail(self, pos):
+        idx = self._index(pos)
+        self.cells.append(pos)
+        self.occupied[idx] = 1
+        self.free.take(idx)
+
+    def pop_tail(self):
+        pos = self.cells.pop()
+        idx = self._index(pos)
+        self.occupied[idx] = 0
+        self.free.put(idx)
+        if self.changes is not None:
+            self.changes.append(pos)
+        return pos
+
+    def track_changes(self):
+        self.changes = []
+
+    def drain_changes(self):
+        changes = self.changes
+        self.changes = []
+        return changes
+
+    def hits_body(self, pos):
+        # 等价于原来的 pos in positions[1:]：蛇身格子互不重复，所以只需排除蛇头
+        return pos in self and pos != self.cells[0]
+
+    def random_free_cell(self, rng=random):
+        # 从空闲格子池中直接抽取，棋盘已满时返回 None
+        if not self.free:
+            return None
+        idx = self.free.sample(rng)
+        return (idx % self.width, idx // self.width)
+
+    def clear(self):
+        self.cells.clear()
+        self.occupied = bytearray(self.width * self.height)
+        self.free = FreeCells(self.width * self.height)
+
+
+# 方向常量：上、下、左、右
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+
+FOOD_SCORE = 10
+
+
+class SnakeEngine:
+    # 纯逻辑贪吃蛇引擎：不依赖 pygame，也不依赖真实时间
+    # 每调用一次 step() 蛇前进一格，规则与原 Snake.update / Snake.grow 一致
+    def __init__(self, width, height, seed=None):
+        self.width = width
+        self.height = height
+        self.rng = random.Random(seed)
+        self.reset()
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
+        self.body = SnakeBody(self.width, self.height, [(self.width // 2, self.height // 2)])
+        self.direction = self.rng.choice(DIRECTIONS)
+        self.grow_to = 3
+        self.score = 0
+        self.move_delay = 150  # 毫秒，仅供前端控制节奏
+        self.steps = 0
+        self.done = False
+        self.food = self.body.random_free_cell(self.rng)
+
+    @property
+    def head(self):
+        return self.body.head
+
+    def change_direction(self, direction):
+        # 防止蛇反向移动
+        if (direction[0] * -1, direction[1] * -1) != self.direction:
+            self.direction = direction
+
+    def grow(self):
+        self.grow_to += 1
+        self.score += FOOD_SCORE
+        # 提高游戏速度
+        self.move_delay = max(50, self.move_delay - 2)
+
+    def step(self, action=None):
+        # 前进一格，返回 (reward, done)；action 为新的方向，None 表示保持当前方向
+        if self.done:
+            return 0, True
+        if action is not None:
+            self.change_direction(action)
+
+        head = self.body.head
+        dx, dy = self.direction
+        new_position = ((head[0] + dx) % self.width, (head[1] + dy) % self.height)
+        self.steps += 1
+
+        # 检查是否撞到自己
+        if self.body.hits_body(new_position):
+            self.done = True
+            return 0, True
+
+        self.body.push_head(new_position)
+        if len(self.body) > self.grow_to:
+            self.body.pop_tail()
+
+        # 检查是否吃到食物
+        if new_position == self.food:
+            self.grow()
+            self.food = self.body.random_free_cell(self.rng)
+            if self.food is None:
+                # 棋盘已被占满
+                self.done = True
+            return FOOD_SCORE, self.done
+        return 0, False
@@ -0,0 +1,270 @@
+# snake_replay.py
+# 贪吃蛇录像：记录种子、初始方向和每一步的方向变化/重开，保存为紧凑的二进制文件，
+# 可以确定性地重放（通过渲染器按真实速度，或无头全速）
+# 用法: python snake_replay.py play FILE
+#       python snake_replay.py record-autopilot FILE [--steps 10000 --width 40 --height 30]
+
+import argparse
+import random
+import struct
+import time
+
+from snake_core import DIRECTIONS, SnakeEngine
+
+MAGIC = b"SNKR"
+VERSION = 1
+# 文件头：魔数、版本、宽、高、随机种子、初始方向
+HEADER = struct.Struct("<4sBHHQB")
+# 种子按无符号 64 位整数保存
+SEED_LIMIT = 1 << 64
+# 文件尾：结束时的 tick、得分、蛇头坐标、长度，用于校验重放结果
+TRAILER = struct.Struct("<IIHHI")
+
+# 事件编码：0-3 为 DIRECTIONS 中的方向，4 为重开，5 为录像结束
+EV_RESET = 4
+EV_END = 5
+EV_BITS = 3
+
+
+class ReplayError(Exception):
+    pass
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError("录像数据被截断")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    # 一段录像：events 为 (tick, code) 列表，tick 是自录像开始以来引擎实际前进的步数
+    def __init__(self, width, height, seed, initial_direction, events=None, final=None):
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.initial_direction = initial_direction
+        self.events = events if events is not None else []
+        self.final = final  # (tick, score, head_x, head_y, length)
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.width, self.height,
+                                    self.seed, self.initial_direction))
+        last = 0
+        for tick, code in self.events:
+            # 与上一个事件的 tick 差值和事件编码合并成一个变长整数，通常只占 1 字节
+            _write_varint(out, ((tick - last) << EV_BITS) | code)
+            last = tick
+        out += TRAILER.pack(*self.final)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size + TRAILER.size:
+            raise ReplayError("录像文件太短")
+        magic, version, width, height, seed, initial = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError("不是贪吃蛇录像文件")
+        if version != VERSION:
+            raise ReplayError(f"不支持的录像版本: {version}")
+        events = []
+        pos = HEADER.size
+        tick = 0
+        end = len(data) - TRAILER.size
+        while pos < end:
+            value, pos = _read_varint(data, pos)
+            tick += value >> EV_BITS
+            code = value & ((1 << EV_BITS) - 1)
+            events.append((tick, code))
+            if code == EV_END:
+                break
+        if not events or events[-1][1] != EV_END:
+            raise ReplayError("录像缺少结束标记")
+        final = TRAILER.unpack_from(data, end)
+        return cls(width, height, seed, initial, events, final)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def seed_arg(text):
+    # argparse 的 type：录像头只能保存 0 ~ 2**64-1 的种子
+    seed = int(text)
+    if not 0 <= seed < SEED_LIMIT:
+        raise argparse.ArgumentTypeError(f"种子必须在 0 ~ {SEED_LIMIT - 1} 之间: {text}")
+    return seed
+
+
+class ReplayRecorder:
+    # 录制：在方向真正改变和重开时记录事件
+    def __init__(self, engine, seed):
+        # 在开始录制前检查种子，避免整局玩完后才在保存时失败
+        if not 0 <= seed < SEED_LIMIT:
+            raise ReplayError(f"种子超出录像可保存的范围 (0 ~ {SEED_LIMIT - 1}): {seed}")
+        self.engine = engine
+        self.offset = 0
+        self.replay = Replay(engine.width, engine.height, seed, DIRECTIONS.index(engine.direction))
+
+    def tick(self):
+        return self.offset + self.engine.steps
+
+    def direction(self, old_direction):
+        # 在 change_direction 之后调用；被拒绝的反向和重复方向不记录
+        direction = self.engine.direction
+        if direction != old_direction:
+            self.replay.events.append((self.tick(), DIRECTIONS.index(direction)))
+
+    def reset(self):
+        # 在引擎重开之前调用
+        self.replay.events.append((self.tick(), EV_RESET))
+        self.offset += self.engine.steps
+
+    def finish(self):
+        engine = self.engine
+        tick = self.tick()
+        self.replay.events.append((tick, EV_END))
+        head = engine.head
+        self.replay.final = (tick, engine.score, head[0], head[1], len(engine.body))
+        return self.replay
+
+    def save(self, path):
+        self.finish().save(path)
+
+
+class ReplayPlayer:
+    # 重放：每次引擎前进之前调用 apply_due，把到期的事件应用到引擎上
+    def __init__(self, replay):
+        self.replay = replay
+        self.index = 0
+        self.offset = 0
+
+    def new_engine(self):
+        replay = self.replay
+        engine = SnakeEngine(replay.width, replay.height, replay.seed)
+        if DIRECTIONS.index(engine.direction) != replay.initial_direction:
+            raise ReplayError("初始方向与录像不一致")
+        return engine
+
+    def tick(self, engine):
+        return self.offset + engine.steps
+
+    @property
+    def finished(self):
+        return self.index >= len(self.replay.events)
+
+    def apply_due(self, engine):
+        # 返回本次是否发生了重开
+        events = self.replay.events
+        tick = self.tick(engine)
+        reset = False
+        while self.index < len(events) and events[self.index][0] <= tick:
+            code = events[self.index][1]
+            self.index += 1
+            if code == EV_RESET:
+                self.offset += engine.steps
+                engine.reset()
+                reset = True
+            elif code != EV_END:
+                engine.change_direction(DIRECTIONS[code])
+        return reset
+
+
+def iter_ticks(replay):
+    # 无头全速逐步重放，每前进一步产出 (tick, engine)，便于与其他引擎逐帧对照
+    player = ReplayPlayer(replay)
+    engine = player.new_engine()
+    while True:
+        player.apply_due(engine)
+        if player.finished or engine.done:
+            break
+        engine.step()
+        yield player.tick(engine), engine
+
+
+def play(replay):
+    # 全速重放并校验结束状态，返回 (engine, 步数, 耗时秒)
+    engine = None
+    ticks = 0
+    start = time.perf_counter()
+    for ticks, engine in iter_ticks(replay):
+        pass
+    elapsed = time.perf_counter() - start
+    if engine is None:
+        engine = ReplayPlayer(replay).new_engine()
+    head = engine.head
+    final = (ticks, engine.score, head[0], head[1], len(engine.body))
+    if final != replay.final:
+        raise ReplayError(f"重放结果不一致: 期望 {replay.final}, 实际 {final}")
+    return engine, ticks, elapsed
+
+
+def record_autopilot(path, width, height, steps, seed):
+    # 无头地让自动驾驶玩一段并录像，用来生成可复现的性能回归轨迹
+    from snake_autopilot import Autopilot
+
+    engine = SnakeEngine(width, height, seed)
+    recorder = ReplayRecorder(engine, seed)
+    pilot = Autopilot(engine)
+    for _ in range(steps):
+        direction = pilot.decide()
+        if direction is not None:
+            old = engine.direction
+            engine.change_direction(direction)
+            recorder.direction(old)
+        engine.step()
+        if engine.done:
+            recorder.reset()
+            engine.reset()
+    recorder.save(path)
+    return recorder.replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description="贪吃蛇录像工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    play_cmd = sub.add_parser("play", help="无头全速重放并校验")
+    play_cmd.add_argument("file")
+
+    rec = sub.add_parser("record-autopilot", help="用自动驾驶无头录制一段录像")
+    rec.add_argument("file")
+    rec.add_argument("--steps", type=int, default=10000)
+    rec.add_argument("--width", type=int, default=40)
+    rec.add_argument("--height", type=int, default=30)
+    rec.add_argument("--seed", type=seed_arg, default=None)
+
+    args = parser.parse_args()
+    if args.command == "play":
+        replay = Replay.load(args.file)
+        engine, ticks, elapsed = play(replay)
+        print(f"重放 {ticks} 步, 得分 {engine.score}, 耗时 {elapsed * 1000:.1f} ms "
+              f"({ticks / max(elapsed, 1e-9):,.0f} 步/秒), 结果一致")
+    elif args.command == "record-autopilot":
+        seed = args.seed if args.seed is not None else random.randrange(SEED_LIMIT)
+        replay = record_autopilot(args.file, args.width, args.height, args.steps, seed)
+        size = len(replay.to_bytes())
+        print(f"已录制 {replay.final[0]} 步, {len(replay.events)} 个事件, {size} 字节 -> {args.file}")
+
+
+if __name__ == "__main__":
+    main()
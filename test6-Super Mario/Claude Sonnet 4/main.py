@@ -1,14 +1,19 @@
+import os
 import pygame
 import random
 import sys
 
-# 初始化Pygame
-pygame.init()
+# 文字缓存和数组化的敌人存储是各版本共用的模块，在上一级目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from entities import PatrolStore
+from text import TextCache
 
 # 游戏设置
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FPS = 60
+TEXT_CACHE_SIZE = 64  # 最多缓存多少个渲染好的文字表面
+SPATIAL_CELL_SIZE = 100  # 空间哈希的格子边长（像素），取最常见物体尺寸的 2~3 倍
 
 # 颜色定义
 WHITE = (255, 255, 255)
@@ -25,9 +30,20 @@ GRAVITY = 0.8
 JUMP_SPEED = -15
 MARIO_SPEED = 5
 
-class Mario(pygame.sprite.Sprite):
+# 游戏开始时显示的操作说明
+INSTRUCTIONS = [
+    "操作说明:",
+    "A/D 或 方向键: 移动",
+    "空格键: 跳跃",
+    "收集金币, 避开/踩死敌人!"
+]
+
+# 会动的精灵都是 DirtySprite，由 LayeredDirty 只重绘它们经过的区域；
+# 平台不会动，直接画进静态背景里
+class Mario(pygame.sprite.DirtySprite):
     def __init__(self):
         super().__init__()
+        self.dirty = 2  # 每帧都在移动，始终重绘
         self.image = pygame.Surface((40, 40))
         self.image.fill(RED)
         self.rect = self.image.get_rect()
@@ -74,58 +90,174 @@ class Platform(pygame.sprite.Sprite):
         self.image.fill(BROWN)
         self.rect = pygame.Rect(x, y, width, height)
 
-class Coin(pygame.sprite.Sprite):
+class Coin(pygame.sprite.DirtySprite):
     def __init__(self, x, y):
-        super().__init__()
+        super().__init__()  # 金币不动，只在出现和被收集时重绘
         self.image = pygame.Surface((20, 20))
         self.image.fill(YELLOW)
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
         
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((30, 30))
-        self.image.fill(GRAY)
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
-        self.speed = random.randint(1, 3)
-        self.direction = random.choice([-1, 1])
+def enemy_image():
+    image = pygame.Surface((30, 30))
+    image.fill(GRAY)
+    return image
+
+class SpatialHash:
+    # 空间哈希：精灵按矩形覆盖的格子登记在字典里，查询时只取附近格子中的精灵作为候选，
+    # 碰撞检测的代价只和局部密度有关，与精灵总数无关；精灵移动后调用 move() 增量更新
+    def __init__(self, cell_size=SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}   # (cx, cy) -> {精灵: None}
+        self.spans = {}   # 精灵 -> 登记时覆盖的格子范围 (x0, y0, x1, y1)
+        self.order = {}   # 精灵 -> 插入序号，查询结果按插入顺序返回，和精灵组的顺序一致
+        self.serial = 0
+        # 统计：查询次数、返回的候选数（每个候选都要做一次精确的矩形检测）
+        self.queries = 0
+        self.candidates = 0
         
-    def update(self):
-        self.rect.x += self.speed * self.direction
+    def __len__(self):
+        return len(self.spans)
         
-        # 边界反弹
-        if self.rect.left < 0 or self.rect.right > SCREEN_WIDTH:
-            self.direction *= -1
+    def _span(self, rect):
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+        
+    def _cells(self, span):
+        x0, y0, x1, y1 = span
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                yield cx, cy
+                
+    def _link(self, sprite, span):
+        self.spans[sprite] = span
+        for key in self._cells(span):
+            self.cells.setdefault(key, {})[sprite] = None
             
-        # 重力（简单版）
-        if self.rect.bottom < SCREEN_HEIGHT - 50:
-            self.rect.y += 5
-        elif self.rect.bottom > SCREEN_HEIGHT - 50:
-            self.rect.bottom = SCREEN_HEIGHT - 50
+    def _unlink(self, sprite):
+        for key in self._cells(self.spans.pop(sprite)):
+            bucket = self.cells[key]
+            del bucket[sprite]
+            if not bucket:
+                del self.cells[key]
+                
+    def insert(self, sprite):
+        self.order[sprite] = self.serial
+        self.serial += 1
+        self._link(sprite, self._span(sprite.rect))
+        
+    def remove(self, sprite):
+        if sprite in self.spans:
+            self._unlink(sprite)
+            del self.order[sprite]
+            
+    def move(self, sprite):
+        # 覆盖的格子没变时什么都不用做
+        span = self._span(sprite.rect)
+        if self.spans[sprite] != span:
+            self._unlink(sprite)
+            self._link(sprite, span)
+            
+    def clear(self):
+        self.cells.clear()
+        self.spans.clear()
+        self.order.clear()
+        
+    def reset_stats(self):
+        self.queries = 0
+        self.candidates = 0
+        
+    def query(self, rect):
+        # 返回与 rect 覆盖的格子有交集的精灵（只是候选，不一定真的相交）
+        found = {}
+        for key in self._cells(self._span(rect)):
+            bucket = self.cells.get(key)
+            if bucket:
+                found.update(bucket)
+        self.queries += 1
+        self.candidates += len(found)
+        return sorted(found, key=self.order.__getitem__)
+        
+    def collide(self, rect):
+        # 候选中真正与 rect 相交的精灵
+        return [sprite for sprite in self.query(rect) if rect.colliderect(sprite.rect)]
+
+class TextSprite(pygame.sprite.DirtySprite):
+    # HUD 文字精灵：只有文字变化或显示/隐藏时才变脏；box 为文字背后底框的颜色（四周留 10 像素）
+    # anchor 为定位方式，如 topleft=(10, 10) 或 center=(400, 300)
+    def __init__(self, box=None, **anchor):
+        super().__init__()
+        self.box = box
+        self.anchor = anchor
+        self.text = None
+        self.image = pygame.Surface((0, 0))
+        self.rect = self.image.get_rect(**anchor)
+        self.visible = 0
+        
+    def show(self, text):
+        # text 为 TextCache 渲染的表面，内容不变时是同一个对象，不会重复变脏
+        if text is not self.text:
+            self.text = text
+            if self.box is None:
+                self.image = text
+            else:
+                self.image = pygame.Surface(text.get_rect().inflate(20, 20).size)
+                self.image.fill(self.box)
+                self.image.blit(text, (10, 10))
+            self.rect = self.image.get_rect(**self.anchor)
+            self.dirty = 1
+        if not self.visible:
+            self.visible = 1
+            
+    def hide(self):
+        if self.visible:
+            self.visible = 0
 
 class Game:
-    def __init__(self):
+    def __init__(self, full_redraw=False, max_fps=FPS):
+        # 导入本模块不会初始化 Pygame；这里只初始化显示子系统，字体由 TextCache 按需初始化
+        pygame.display.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("超级玛丽")
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.Font(None, 36)
+        self.max_fps = max_fps  # 0 表示不限帧率
+        self.text = TextCache(TEXT_CACHE_SIZE)
+        
+        # 渲染：天空、地面和平台预先画在静态背景上；会动的精灵和 HUD 放在 LayeredDirty 中，
+        # 每帧只用背景擦除并重绘脏矩形。full_redraw 为原来的整屏重绘，按 F2 切换以对比帧率
+        self.full_redraw = full_redraw
+        self.repaint = True
+        self.layers = pygame.sprite.LayeredDirty()
+        # 固定使用脏矩形模式，不让 LayeredDirty 根据耗时自动切换成整屏模式
+        self.layers.set_timing_threshold(float('inf'))
+        self.create_hud()
         
         # 创建精灵组
         self.all_sprites = pygame.sprite.Group()
         self.platforms = pygame.sprite.Group()
         self.coins = pygame.sprite.Group()
-        self.enemies = pygame.sprite.Group()
+        # 敌人不是精灵，而是数组化的实体存储（在 create_enemies 中按平台创建）；
+        # enemy_area 为上一帧敌人覆盖区域的外接矩形，脏矩形模式下据此擦除
+        self.enemies = None
+        self.enemy_area = None
+        
+        # 碰撞检测的宽相位：平台和金币各用一个空间哈希，敌人由数组存储一次向量化检测
+        self.platform_hash = SpatialHash()
+        self.coin_hash = SpatialHash()
+        self.hashes = (self.platform_hash, self.coin_hash)
+        self.pairs_tested = 0  # 上一帧碰撞检测中测试的候选对数
+        self.show_stats = False  # 按 F3 显示碰撞统计
         
         # 创建玛丽
         self.mario = Mario()
         self.all_sprites.add(self.mario)
+        self.layers.add(self.mario)
         
         # 创建平台
         self.create_platforms()
+        self.create_background()
         
         # 创建金币
         self.create_coins()
@@ -146,7 +278,30 @@ class Game:
             platform = Platform(x, y, width, height)
             self.platforms.add(platform)
             self.all_sprites.add(platform)
+            self.platform_hash.insert(platform)
             
+    def create_background(self):
+        self.background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.background.fill(BLUE)  # 天空背景
+        pygame.draw.rect(self.background, GREEN, (0, SCREEN_HEIGHT - 50, SCREEN_WIDTH, 50))
+        for platform in self.platforms:
+            self.background.blit(platform.image, platform.rect)
+        self.layers.clear(self.screen, self.background)
+        self.repaint = True
+        
+    def create_hud(self):
+        center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+        self.score_sprite = TextSprite(topleft=(10, 10))
+        self.lives_sprite = TextSprite(topleft=(10, 50))
+        self.game_over_sprite = TextSprite(BLACK, center=center)
+        self.win_sprite = TextSprite(GREEN, center=center)
+        self.instruction_sprites = [TextSprite(topleft=(SCREEN_WIDTH - 250, 10 + i * 25))
+                                    for i in range(len(INSTRUCTIONS))]
+        self.stats_sprite = TextSprite(topleft=(10, SCREEN_HEIGHT - 30))
+        self.hud = [self.score_sprite, self.lives_sprite, self.game_over_sprite, self.win_sprite,
+                    *self.instruction_sprites, self.stats_sprite]
+        self.layers.add(*self.hud, layer=1)
+        
     def create_coins(self):
         coin_positions = [
             (220, 360), (430, 260), (630, 410),
@@ -158,18 +313,26 @@ class Game:
             coin = Coin(x, y)
             self.coins.add(coin)
             self.all_sprites.add(coin)
+            self.layers.add(coin)
+            self.coin_hash.insert(coin)
             
     def create_enemies(self):
         enemy_positions = [(350, 520), (600, 520), (200, 520)]
         
+        # 敌人在地面和平台上来回走，走到屏幕边缘掉头；速度和方向随机
+        ground = pygame.Rect(0, SCREEN_HEIGHT - 50, SCREEN_WIDTH, 50)
+        self.enemies = PatrolStore(enemy_image(), [ground] + [p.rect for p in self.platforms],
+                                   SCREEN_HEIGHT, GRAVITY)
         for x, y in enemy_positions:
-            enemy = Enemy(x, y)
-            self.enemies.add(enemy)
-            self.all_sprites.add(enemy)
+            self.enemies.spawn(x, y, random.randint(1, 3) * random.choice([-1, 1]))
             
     def handle_collisions(self):
+        # 所有检测都先向空间哈希查询附近的候选，只对候选做精确的矩形检测
+        for spatial_hash in self.hashes:
+            spatial_hash.reset_stats()
+            
         # 玛丽与平台碰撞
-        hits = pygame.sprite.spritecollide(self.mario, self.platforms, False)
+        hits = self.platform_hash.collide(self.mario.rect)
         for hit in hits:
             if self.mario.velocity_y > 0:  # 向下移动时
                 if self.mario.rect.bottom <= hit.rect.top + 10:
@@ -178,29 +341,35 @@ class Game:
                     self.mario.on_ground = True
                     
         # 玛丽与金币碰撞
-        hits = pygame.sprite.spritecollide(self.mario, self.coins, True)
+        hits = self.coin_hash.collide(self.mario.rect)
         for hit in hits:
+            hit.kill()
+            self.coin_hash.remove(hit)
             self.mario.score += 100
             
-        # 玛丽与敌人碰撞
-        hits = pygame.sprite.spritecollide(self.mario, self.enemies, False)
+        # 玛丽与敌人碰撞：和全部存活的敌人一次向量化检测
+        enemies_tested = len(self.enemies)
+        hits = self.enemies.collide(self.mario.rect)
         for hit in hits:
+            rect = self.enemies.rect(hit)
             # 如果玛丽从上方踩到敌人
-            if self.mario.velocity_y > 0 and self.mario.rect.bottom <= hit.rect.centery:
-                hit.kill()
+            if self.mario.velocity_y > 0 and self.mario.rect.bottom <= rect.centery:
+                self.enemies.kill(hit)
                 self.mario.velocity_y = JUMP_SPEED // 2
                 self.mario.score += 200
             else:
                 # 玛丽受伤
                 self.mario.lives -= 1
                 # 简单的击退效果
-                if self.mario.rect.centerx < hit.rect.centerx:
+                if self.mario.rect.centerx < rect.centerx:
                     self.mario.rect.x -= 50
                 else:
                     self.mario.rect.x += 50
                     
                 # 移除敌人（避免连续伤害）
-                hit.kill()
+                self.enemies.kill(hit)
+                
+        self.pairs_tested = sum(spatial_hash.candidates for spatial_hash in self.hashes) + enemies_tested
                 
     def handle_events(self):
         for event in pygame.event.get():
@@ -211,6 +380,11 @@ class Game:
                     self.mario.jump()
                 elif event.key == pygame.K_r and self.mario.lives <= 0:
                     self.restart_game()
+                elif event.key == pygame.K_F3:
+                    self.show_stats = not self.show_stats
+                elif event.key == pygame.K_F2:
+                    self.full_redraw = not self.full_redraw
+                    self.repaint = True
                     
         # 持续按键检测
         keys = pygame.key.get_pressed()
@@ -229,59 +403,95 @@ class Game:
         self.mario.rect.y = SCREEN_HEIGHT - 100
         self.mario.velocity_y = 0
         
-        # 清除所有精灵
+        # 清除所有精灵（kill 同时把它们从渲染层中移除），敌人存储在 create_enemies 中重建
+        for sprite in self.coins.sprites():
+            sprite.kill()
         self.all_sprites.empty()
         self.platforms.empty()
         self.coins.empty()
-        self.enemies.empty()
+        for spatial_hash in self.hashes:
+            spatial_hash.clear()
         
         # 重新创建
         self.all_sprites.add(self.mario)
         self.create_platforms()
+        self.create_background()
         self.create_coins()
         self.create_enemies()
         
+    def update_hud(self):
+        # 文字只在内容变化时才重新渲染，文字精灵也只在这时变脏
+        self.score_sprite.show(self.text.render(f"得分: {self.mario.score}", 36, WHITE))
+        self.lives_sprite.show(self.text.render(f"生命: {self.mario.lives}", 36, WHITE))
+        
+        # 游戏结束界面
+        if self.mario.lives <= 0:
+            self.game_over_sprite.show(self.text.render("游戏结束! 按R键重新开始", 36, WHITE))
+        else:
+            self.game_over_sprite.hide()
+            
+        # 胜利条件（收集所有金币）
+        if len(self.coins) == 0:
+            self.win_sprite.show(self.text.render("恭喜过关! 按R键重新开始", 36, WHITE))
+        else:
+            self.win_sprite.hide()
+            
+        # 显示操作说明（游戏开始时显示）
+        for sprite, instruction in zip(self.instruction_sprites, INSTRUCTIONS):
+            if self.mario.score == 0:
+                sprite.show(self.text.render(instruction, 24, WHITE))
+            else:
+                sprite.hide()
+                
+        # 碰撞和渲染统计：每帧测试的候选对数、场上的实体数、帧率和当前渲染方式
+        if self.show_stats:
+            entities = sum(len(spatial_hash) for spatial_hash in self.hashes) + len(self.enemies)
+            mode = "整屏重绘" if self.full_redraw else "脏矩形"
+            stats = f"候选对/帧: {self.pairs_tested}  实体: {entities}  FPS: {self.clock.get_fps():.0f} ({mode})"
+            self.stats_sprite.show(self.text.render(stats, 24, WHITE))
+        else:
+            self.stats_sprite.hide()
+            
     def draw(self):
+        self.update_hud()
+        if self.full_redraw:
+            self.draw_full()
+        else:
+            self.draw_dirty()
+            
+    def draw_dirty(self):
+        # 只把背景贴回上一帧精灵所在的位置并重绘变化的精灵，只提交这些矩形
+        if self.repaint:
+            # 第一帧、重新开始或切换模式后整屏重画一次
+            self.layers.repaint_rect(self.screen.get_rect())
+            self.repaint = False
+        # 敌人不在 LayeredDirty 中：把它们上一帧和这一帧覆盖区域的外接矩形交给 LayeredDirty
+        # 用背景和其中的精灵重画，再把敌人整批画上去（这块区域已包含在要提交的矩形中）
+        area = self.enemies.bounds()
+        areas = [rect for rect in (self.enemy_area, area) if rect is not None]
+        if areas:
+            self.layers.repaint_rect(areas[0].unionall(areas[1:]))
+        self.enemy_area = area
+        dirty = self.layers.draw(self.screen)
+        self.enemies.draw(self.screen, self.screen.get_rect())
+        pygame.display.update(dirty)
+        
+    def draw_full(self):
+        # 原来的整屏重绘：每帧重画天空、地面和所有精灵
         self.screen.fill(BLUE)  # 天空背景
         
         # 绘制地面
         pygame.draw.rect(self.screen, GREEN, 
                         (0, SCREEN_HEIGHT - 50, SCREEN_WIDTH, 50))
         
-        # 绘制所有精灵
+        # 绘制所有精灵和敌人
         self.all_sprites.draw(self.screen)
+        self.enemies.draw(self.screen, self.screen.get_rect())
         
         # 绘制UI信息
-        score_text = self.font.render(f"得分: {self.mario.score}", True, WHITE)
-        lives_text = self.font.render(f"生命: {self.mario.lives}", True, WHITE)
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(lives_text, (10, 50))
-        
-        # 游戏结束界面
-        if self.mario.lives <= 0:
-            game_over_text = self.font.render("游戏结束! 按R键重新开始", True, WHITE)
-            text_rect = game_over_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
-            pygame.draw.rect(self.screen, BLACK, text_rect.inflate(20, 20))
-            self.screen.blit(game_over_text, text_rect)
-            
-        # 胜利条件（收集所有金币）
-        if len(self.coins) == 0:
-            win_text = self.font.render("恭喜过关! 按R键重新开始", True, WHITE)
-            text_rect = win_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
-            pygame.draw.rect(self.screen, GREEN, text_rect.inflate(20, 20))
-            self.screen.blit(win_text, text_rect)
-            
-        # 显示操作说明
-        if self.mario.score == 0:  # 游戏开始时显示
-            instructions = [
-                "操作说明:",
-                "A/D 或 方向键: 移动",
-                "空格键: 跳跃",
-                "收集金币, 避开/踩死敌人!"
-            ]
-            for i, instruction in enumerate(instructions):
-                text = pygame.font.Font(None, 24).render(instruction, True, WHITE)
-                self.screen.blit(text, (SCREEN_WIDTH - 250, 10 + i * 25))
+        for sprite in self.hud:
+            if sprite.visible:
+                self.screen.blit(sprite.image, sprite.rect)
         
         pygame.display.flip()
         
@@ -293,14 +503,17 @@ class Game:
             # 只有在游戏进行中才更新
             if self.mario.lives > 0:
                 self.all_sprites.update()
+                self.enemies.update()
                 self.handle_collisions()
                 
             self.draw()
-            self.clock.tick(FPS)
+            self.clock.tick(self.max_fps)
             
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
-    game = Game()
+    # --full-redraw: 以整屏重绘模式启动；--uncapped: 不限帧率，用来对比两种渲染方式的 FPS
+    game = Game(full_redraw='--full-redraw' in sys.argv,
+                max_fps=0 if '--uncapped' in sys.argv else FPS)
     game.run()
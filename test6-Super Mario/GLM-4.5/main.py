@@ -1,9 +1,12 @@
+import os
 import pygame
 import sys
 import random
+import math
 
-# 初始化Pygame
-pygame.init()
+# 数组化的敌人存储是各版本共用的模块，在上一级目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from entities import PatrolStore
 
 # 游戏常量
 SCREEN_WIDTH = 800
@@ -23,6 +26,37 @@ YELLOW = (255, 255, 0)
 BROWN = (139, 69, 19)
 ORANGE = (255, 165, 0)
 PURPLE = (128, 0, 128)
+COLOR_KEY = (255, 0, 255)  # 颜色键图像中当作透明的颜色
+
+COIN_FRAMES = 16  # 金币旋转动画预先渲染的帧数（半圈，|cos| 的周期）
+GROUND_Y = 550  # 地面顶部，远山的山脚
+STOMP_SCORE = 100  # 踩死一个敌人的得分
+COIN_SCORE = 50  # 收集一枚金币的得分
+
+class EntityList:
+    # 支持延迟删除的实体列表：remove() 只给实体打上墓碑标记（alive = False），是 O(1) 的，
+    # 遍历时跳过已删除的实体，所以碰撞循环中删除是安全的；帧末 compact() 一次性清理
+    def __init__(self, items=()):
+        self.items = list(items)
+        self.dead = 0
+        
+    def __iter__(self):
+        for item in self.items:
+            if item.alive:
+                yield item
+                
+    def __len__(self):
+        return len(self.items) - self.dead
+        
+    def remove(self, item):
+        if item.alive:
+            item.alive = False
+            self.dead += 1
+            
+    def compact(self):
+        if self.dead:
+            self.items = [item for item in self.items if item.alive]
+            self.dead = 0
 
 class Player:
     def __init__(self, x, y):
@@ -36,7 +70,8 @@ class Player:
         self.lives = 3
         self.score = 0
         
-    def update(self, platforms, enemies, coins):
+    def update(self, platforms, enemies, coins, events):
+        # 踩死的敌人和收集的金币只做删除标记，并记入本帧的事件列表 events，由游戏在帧末结算
         # 应用重力
         self.vel_y += GRAVITY
         
@@ -70,21 +105,20 @@ class Player:
                     self.vel_y = 0
                     
         # 敌人碰撞检测
-        for enemy in enemies:
-            if player_rect.colliderect(enemy.rect):
-                if self.vel_y > 0 and self.y < enemy.y:  # 从上方踩到敌人
-                    self.vel_y = JUMP_STRENGTH // 2
-                    enemies.remove(enemy)
-                    self.score += 100
-                else:  # 被敌人碰到
-                    self.lives -= 1
-                    self.respawn()
+        for enemy in enemies.collide(player_rect):
+            if self.vel_y > 0 and self.y < enemies.y[enemy]:  # 从上方踩到敌人
+                self.vel_y = JUMP_STRENGTH // 2
+                enemies.kill(enemy)
+                events.append(('stomp', enemy))
+            else:  # 被敌人碰到
+                self.lives -= 1
+                self.respawn()
                     
         # 金币收集检测
-        for coin in coins[:]:
+        for coin in coins:
             if player_rect.colliderect(coin.rect):
                 coins.remove(coin)
-                self.score += 50
+                events.append(('coin', coin))
                 
     def jump(self):
         if self.on_ground:
@@ -105,17 +139,8 @@ class Player:
         self.vel_x = 0
         self.vel_y = 0
         
-    def draw(self, screen):
-        # 绘制玛丽（简单的红色帽子和蓝色衣服）
-        # 帽子
-        pygame.draw.rect(screen, RED, (self.x, self.y, self.width, 15))
-        # 脸
-        pygame.draw.rect(screen, (255, 220, 177), (self.x + 5, self.y + 15, 20, 15))
-        # 身体
-        pygame.draw.rect(screen, BLUE, (self.x + 5, self.y + 30, 20, 10))
-        # 腿
-        pygame.draw.rect(screen, (0, 0, 139), (self.x + 8, self.y + 40, 6, 10))
-        pygame.draw.rect(screen, (0, 0, 139), (self.x + 16, self.y + 40, 6, 10))
+    def draw(self, screen, animations):
+        screen.blit(animations.player, (self.x, self.y))
 
 class Platform:
     def __init__(self, x, y, width, height, color=BROWN):
@@ -130,49 +155,6 @@ class Platform:
                            (self.rect.x + i, self.rect.y), 
                            (self.rect.x + i, self.rect.y + self.rect.height), 1)
 
-class Enemy:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.width = 30
-        self.height = 30
-        self.vel_x = ENEMY_SPEED
-        self.rect = pygame.Rect(x, y, self.width, self.height)
-        self.direction = 1
-        
-    def update(self, platforms):
-        # 简单的左右移动
-        self.x += self.vel_x * self.direction
-        self.rect.x = self.x
-        
-        # 检查是否到达平台边缘
-        on_platform = False
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect):
-                if self.rect.bottom == platform.rect.top:
-                    on_platform = True
-                    # 检查前方是否有平台
-                    next_x = self.x + (self.width + 10) * self.direction
-                    if not platform.rect.collidepoint(next_x, platform.rect.top):
-                        self.direction *= -1
-                        break
-                        
-        if not on_platform:
-            self.direction *= -1
-            
-    def draw(self, screen):
-        # 绘制蘑菇怪
-        # 身体
-        pygame.draw.ellipse(screen, ORANGE, (self.x, self.y + 10, self.width, 20))
-        # 头
-        pygame.draw.circle(screen, RED, (self.x + self.width // 2, self.y + 10), 15)
-        # 白色斑点
-        pygame.draw.circle(screen, WHITE, (self.x + 8, self.y + 8), 3)
-        pygame.draw.circle(screen, WHITE, (self.x + 22, self.y + 8), 3)
-        # 眼睛
-        pygame.draw.circle(screen, BLACK, (self.x + 10, self.y + 12), 2)
-        pygame.draw.circle(screen, BLACK, (self.x + 20, self.y + 12), 2)
-
 class Coin:
     def __init__(self, x, y):
         self.x = x
@@ -181,27 +163,152 @@ class Coin:
         self.rect = pygame.Rect(x - self.radius, y - self.radius, 
                                self.radius * 2, self.radius * 2)
         self.animation_offset = 0
+        self.alive = True
         
     def update(self):
         # 金币动画
         self.animation_offset += 0.1
         
-    def draw(self, screen):
+    def draw(self, screen, animations):
         # 绘制旋转的金币
-        y_offset = abs(pygame.math.Vector2(0, 1).rotate(self.animation_offset * 50).y) * 3
-        pygame.draw.ellipse(screen, YELLOW, 
-                          (self.x - self.radius, self.y - self.radius + y_offset, 
-                           self.radius * 2, self.radius * 2 - y_offset * 2))
-        pygame.draw.ellipse(screen, ORANGE, 
-                          (self.x - self.radius, self.y - self.radius + y_offset, 
-                           self.radius * 2, self.radius * 2 - y_offset * 2), 2)
+        screen.blit(animations.coin(self.animation_offset), (self.x - self.radius, self.y - self.radius))
+
+class Animations:
+    # 动画帧缓存：启动时把每种实体的各帧画到表面上一次，绘制时按动画时间选帧，
+    # 无论图案多复杂，每个实体每帧都只需一次 blit
+    def __init__(self):
+        self.player = self.render_player()
+        self.enemy = self.render_enemy()
+        self.coins = [self.render_coin(i * 180 / COIN_FRAMES) for i in range(COIN_FRAMES)]
+        
+    def coin(self, animation_offset):
+        # 金币每帧转 5 度，压扁程度按 |cos| 变化，半圈为一个周期
+        angle = animation_offset * 50 % 180
+        return self.coins[int(angle * COIN_FRAMES / 180) % COIN_FRAMES]
+        
+    def render_player(self):
+        # 玛丽（简单的红色帽子和蓝色衣服）
+        image = pygame.Surface((30, 50), pygame.SRCALPHA)
+        # 帽子
+        pygame.draw.rect(image, RED, (0, 0, 30, 15))
+        # 脸
+        pygame.draw.rect(image, (255, 220, 177), (5, 15, 20, 15))
+        # 身体
+        pygame.draw.rect(image, BLUE, (5, 30, 20, 10))
+        # 腿
+        pygame.draw.rect(image, (0, 0, 139), (8, 40, 6, 10))
+        pygame.draw.rect(image, (0, 0, 139), (16, 40, 6, 10))
+        return image.convert_alpha()
+        
+    def render_enemy(self):
+        # 蘑菇怪，图像原点在敌人左上角上方 5 像素处。敌人成千上万时每帧都要整批绘制，
+        # 而图像只有全透明和不透明两种像素，所以用 RLE 加速的颜色键代替逐像素 alpha
+        image = pygame.Surface((30, 35))
+        image.fill(COLOR_KEY)
+        # 身体
+        pygame.draw.ellipse(image, ORANGE, (0, 15, 30, 20))
+        # 头
+        pygame.draw.circle(image, RED, (15, 15), 15)
+        # 白色斑点
+        pygame.draw.circle(image, WHITE, (8, 13), 3)
+        pygame.draw.circle(image, WHITE, (22, 13), 3)
+        # 眼睛
+        pygame.draw.circle(image, BLACK, (10, 17), 2)
+        pygame.draw.circle(image, BLACK, (20, 17), 2)
+        image.set_colorkey(COLOR_KEY, pygame.RLEACCEL)
+        return image.convert()
+        
+    def render_coin(self, angle):
+        # 旋转到 angle 度的金币
+        y_offset = abs(pygame.math.Vector2(0, 1).rotate(angle).y) * 3
+        image = pygame.Surface((20, 20), pygame.SRCALPHA)
+        pygame.draw.ellipse(image, YELLOW, (0, y_offset, 20, 20 - y_offset * 2))
+        pygame.draw.ellipse(image, ORANGE, (0, y_offset, 20, 20 - y_offset * 2), 2)
+        return image.convert_alpha()
+
+class ParallaxLayer:
+    # 可水平平铺的背景层：图像横向拼两份缓存成一张宽表面，任意偏移处一屏宽的内容都连续，
+    # 每帧只需一次只取子区域的 blit；rate 为相对玩家移动的卷动比例，drift 为每帧自动漂移的像素
+    def __init__(self, image, y, rate, drift=0):
+        self.width, self.height = image.get_size()
+        self.y = y
+        self.rate = rate
+        self.drift = drift
+        self.wide = pygame.Surface((self.width * 2, self.height), pygame.SRCALPHA)
+        self.wide.blit(image, (0, 0))
+        self.wide.blit(image, (self.width, 0))
+        self.wide = self.wide.convert_alpha()
+        
+    def draw(self, screen, scroll_x, ticks):
+        offset = int(scroll_x * self.rate + ticks * self.drift) % self.width
+        screen.blit(self.wide, (0, self.y), (offset, 0, SCREEN_WIDTH, self.height))
+
+class Background:
+    # 视差背景：天空渐变、远近两层云和两层山都在启动时画好，由远到近各卷动得越来越快，
+    # 无论背景多丰富，每帧都只有固定的几次 blit
+    def __init__(self):
+        self.sky = self.render_sky((90, 160, 230), (200, 230, 250))
+        self.layers = [
+            ParallaxLayer(self.render_clouds([(60, 40), (330, 90), (560, 30)], 0.6), 0, 0.05, 0.1),
+            ParallaxLayer(self.render_clouds([(100, 50), (350, 80), (600, 110)], 1.0), 0, 0.15, 0.25),
+            ParallaxLayer(self.render_hills((120, 170, 140), 180, (2, 5)), GROUND_Y - 180, 0.3),
+            ParallaxLayer(self.render_hills((60, 140, 70), 110, (3, 4)), GROUND_Y - 110, 0.6),
+        ]
+        self.ticks = 0
+        
+    def update(self):
+        self.ticks += 1
+        
+    def draw(self, screen, scroll_x):
+        # scroll_x 为玩家的横坐标：玩家向右走，背景向左移
+        screen.blit(self.sky, (0, 0))
+        for layer in self.layers:
+            layer.draw(screen, scroll_x, self.ticks)
+            
+    def render_sky(self, top, bottom):
+        # 从上到下的天空渐变，不卷动
+        sky = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        for y in range(SCREEN_HEIGHT):
+            t = y / (SCREEN_HEIGHT - 1)
+            color = [round(a + (b - a) * t) for a, b in zip(top, bottom)]
+            pygame.draw.line(sky, color, (0, y), (SCREEN_WIDTH - 1, y))
+        return sky.convert()
+        
+    def render_clouds(self, positions, scale):
+        # 每朵云由三个圆组成；跨过右边界的部分在左边再画一次，保证首尾相接
+        image = pygame.Surface((SCREEN_WIDTH, 200), pygame.SRCALPHA)
+        for x, y in positions:
+            for shift in (-SCREEN_WIDTH, 0):
+                cx = x + shift
+                pygame.draw.circle(image, WHITE, (cx, y), round(30 * scale))
+                pygame.draw.circle(image, WHITE, (cx + round(25 * scale), y), round(35 * scale))
+                pygame.draw.circle(image, WHITE, (cx + round(50 * scale), y), round(30 * scale))
+        return image
+        
+    def render_hills(self, color, height, waves):
+        # 起伏的山：两个正弦波叠加，波数都是整数，所以左右两端高度相同、可以平铺
+        first, second = waves
+        points = [(0, height)]
+        for x in range(0, SCREEN_WIDTH + 1, 8):
+            t = 2 * math.pi * x / SCREEN_WIDTH
+            wave = 0.6 * math.sin(first * t) + 0.4 * math.sin(second * t + 1)
+            points.append((x, height * (0.55 - 0.45 * wave)))
+        points.append((SCREEN_WIDTH, height))
+        image = pygame.Surface((SCREEN_WIDTH, height), pygame.SRCALPHA)
+        pygame.draw.polygon(image, color, points)
+        return image
 
 class Game:
     def __init__(self):
+        # 导入本模块不会初始化 Pygame；创建游戏时只初始化用到的显示和字体子系统
+        pygame.display.init()
+        pygame.font.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("超级玛丽")
         self.clock = pygame.time.Clock()
         self.font = pygame.font.Font(None, 36)
+        self.animations = Animations()
+        self.background = Background()
         self.reset_game()
         
     def reset_game(self):
@@ -209,6 +316,7 @@ class Game:
         self.platforms = self.create_platforms()
         self.enemies = self.create_enemies()
         self.coins = self.create_coins()
+        self.events = []  # 本帧发生的事件：('stomp', 敌人下标) / ('coin', 金币)
         self.game_over = False
         self.game_won = False
         
@@ -231,10 +339,13 @@ class Game:
         return platforms
         
     def create_enemies(self):
-        enemies = []
-        enemies.append(Enemy(250, 520))
-        enemies.append(Enemy(450, 320))
-        enemies.append(Enemy(650, 220))
+        # 敌人是数组化的实体存储：生成时按平台算好巡逻范围，掉出屏幕就移除；
+        # 碰撞矩形 30x30，蘑菇头图像比身体高出 5 像素
+        enemies = PatrolStore(self.animations.enemy, [p.rect for p in self.platforms], SCREEN_HEIGHT,
+                              GRAVITY, size=(30, 30), offset=(0, -5))
+        enemies.spawn(250, 520, ENEMY_SPEED)
+        enemies.spawn(450, 320, ENEMY_SPEED)
+        enemies.spawn(650, 220, ENEMY_SPEED)
         return enemies
         
     def create_coins(self):
@@ -248,7 +359,7 @@ class Game:
         coins.append(Coin(550, 200))
         coins.append(Coin(300, 500))
         coins.append(Coin(500, 500))
-        return coins
+        return EntityList(coins)
         
     def handle_events(self):
         for event in pygame.event.get():
@@ -276,14 +387,23 @@ class Game:
                 self.player.stop()
                 
             # 更新游戏对象
-            self.player.update(self.platforms, self.enemies, self.coins)
+            self.events = []
+            self.background.update()
+            self.player.update(self.platforms, self.enemies, self.coins, self.events)
             
-            for enemy in self.enemies:
-                enemy.update(self.platforms)
+            self.enemies.update()
                 
             for coin in self.coins:
                 coin.update()
                 
+            # 帧末结算事件，再清理被删除的金币（敌人存储自己压缩死槽位）
+            for kind, entity in self.events:
+                if kind == 'stomp':
+                    self.player.score += STOMP_SCORE
+                elif kind == 'coin':
+                    self.player.score += COIN_SCORE
+            self.coins.compact()
+                
             # 检查游戏状态
             if self.player.lives <= 0:
                 self.game_over = True
@@ -291,28 +411,19 @@ class Game:
                 self.game_won = True
                 
     def draw(self):
-        # 背景
-        self.screen.fill((135, 206, 235))  # 天蓝色
-        
-        # 绘制云朵
-        for i in range(3):
-            x = 100 + i * 250
-            y = 50 + i * 30
-            pygame.draw.circle(self.screen, WHITE, (x, y), 30)
-            pygame.draw.circle(self.screen, WHITE, (x + 25, y), 35)
-            pygame.draw.circle(self.screen, WHITE, (x + 50, y), 30)
+        # 视差背景（天空、云和山）
+        self.background.draw(self.screen, self.player.x)
             
         # 绘制游戏对象
         for platform in self.platforms:
             platform.draw(self.screen)
             
         for coin in self.coins:
-            coin.draw(self.screen)
+            coin.draw(self.screen, self.animations)
             
-        for enemy in self.enemies:
-            enemy.draw(self.screen)
+        self.enemies.draw(self.screen, self.screen.get_rect())
             
-        self.player.draw(self.screen)
+        self.player.draw(self.screen, self.animations)
         
         # 绘制UI
         score_text = self.font.render(f"分数: {self.player.score}", True, BLACK)
@@ -0,0 +1,32 @@
+# camera.py
+
+import pygame
+from settings import *
+
+class Camera:
+    # 摄像机：精灵始终保存世界坐标，只在绘制时减去摄像机偏移
+    def __init__(self, width, height, level_width):
+        self.rect = pygame.Rect(0, 0, width, height)
+        self.level_width = level_width
+
+    @property
+    def x(self):
+        return self.rect.x
+
+    def apply(self, rect):
+        # 世界坐标 -> 屏幕坐标
+        return rect.move(-self.rect.x, -self.rect.y)
+
+    def update(self, target):
+        # 玩家越过屏幕右侧 1/3 处时向右卷动，不往回卷，也不超出关卡右边界
+        x = int(target.rect.right - self.rect.width * 2 / 3)
+        x = min(x, self.level_width - self.rect.width)
+        if x > self.rect.x:
+            self.rect.x = x
+
+    def draw(self, surface, sprites):
+        # 只绘制与视口相交的精灵
+        view = self.rect
+        for sprite in sprites:
+            if view.colliderect(sprite.rect):
+                surface.blit(sprite.image, (sprite.rect.x - view.x, sprite.rect.y - view.y))
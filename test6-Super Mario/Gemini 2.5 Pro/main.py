@@ -1,42 +1,82 @@
 # main.py
 
+import os
+import sys
 import pygame
+# 瓦片地图、关卡加载器、文字缓存、实体存储等各版本共用的模块在上一级目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from settings import *
 from sprites import *
+from camera import *
+from tilemap import *
+from text import *
+from level import *
+from entities import *
 
 class Game:
-    def __init__(self):
-        # 初始化Pygame和窗口
-        pygame.init()
-        pygame.mixer.init() # 如果要加声音的话
+    def __init__(self, level_file=LEVEL_FILE):
+        # 初始化窗口：只初始化用到的显示子系统，字体由 TextCache 在第一次用到时初始化，
+        # 游戏没有声音，不初始化 mixer（导入本模块不会初始化任何东西）
+        pygame.display.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption(TITLE)
         self.clock = pygame.time.Clock()
+        self.text = TextCache(TEXT_CACHE_SIZE, FONT_NAME)
+        # 相对路径先按当前目录找，找不到再到 levels 目录下找
+        if not os.path.exists(level_file):
+            level_file = os.path.join(LEVEL_DIR, level_file)
+        self.level_file = level_file
         self.running = True
-        self.camera_offset_x = 0
 
     def new(self):
         # 开始一个新游戏
         self.all_sprites = pygame.sprite.Group()
-        self.platforms = pygame.sprite.Group()
-        self.enemies = pygame.sprite.Group()
-
-        # 从地图创建世界
-        for row_index, row in enumerate(LEVEL_MAP):
-            for col_index, tile in enumerate(row):
-                x = col_index * TILE_SIZE
-                y = row_index * TILE_SIZE
-                if tile == 'P':
-                    p = Platform(x, y)
-                    self.all_sprites.add(p)
-                    self.platforms.add(p)
-                elif tile == 'G':
-                    g = Goomba(self, x, y)
-                    self.all_sprites.add(g)
-                    self.enemies.add(g)
-        
-        self.player = Player(self, TILE_SIZE * 5, SCREEN_HEIGHT - TILE_SIZE * 5)
+        # 敌人不是精灵，而是数组化的实体存储，所有 Goomba 每帧一起更新
+        self.enemies = EntityStore(goomba_image())
+
+        # 打开关卡文件（有编译缓存时直接读取缓存）
+        source = open_level(self.level_file)
+        player_pos = source.find_spawn('player') or (TILE_SIZE * 5, SCREEN_HEIGHT - TILE_SIZE * 5)
+
+        # 平台不会移动，不再为每格创建精灵：绘制用分块缓存，碰撞直接查瓦片网格；
+        # 很长的关卡只读入摄像机附近的窗口，敌人等所在窗口第一次加载时再生成
+        self.streaming = source.cols > STREAM_MIN_COLS
+        if self.streaming:
+            self.tilemap = StreamingTileMap(source, {'P': BROWN})
+            self.solid_version = None # 实心格子数组由 stream_level() 按已加载的窗口建立
+        else:
+            level = source.load()
+            source.close()
+            self.tilemap = TileMap(level.grid, level.tile_size, {'P': BROWN},
+                                   level.breakable, level.colliders)
+            self.solid = SolidGrid(level.grid, level.solid, level.tile_size)
+            for kind, x, y in level.spawns:
+                self.spawn(kind, x, y)
+        self.level_width = self.tilemap.width
+        self.camera = Camera(SCREEN_WIDTH, SCREEN_HEIGHT, self.level_width)
+
+        self.player = Player(self, *player_pos)
+        if self.streaming:
+            self.stream_level()
         self.run()
+        if self.streaming:
+            self.tilemap.close()
+
+    def spawn(self, kind, x, y):
+        # 玩家在 new() 中单独放置，出生表中只需生成敌人
+        if kind == 'goomba':
+            self.enemies.spawn(x, y, GOOMBA_SPEED)
+
+    def stream_level(self):
+        # 加载摄像机附近的窗口并生成第一次加载的窗口中的敌人，离开已加载范围的敌人直接移除；
+        # 实心格子数组只覆盖已加载的窗口，窗口变化时重建
+        for kind, x, y in self.tilemap.update(self.camera.rect):
+            self.spawn(kind, x, y)
+        if self.tilemap.version != self.solid_version:
+            self.solid_version = self.tilemap.version
+            origin_col, grid = self.tilemap.loaded_grid()
+            self.solid = SolidGrid(grid, self.tilemap.solid, self.tilemap.tile_size, origin_col)
+        self.enemies.kill_outside(*self.tilemap.loaded_span())
 
     def run(self):
         # 游戏循环
@@ -49,45 +89,43 @@ class Game:
 
     def update(self):
         # 游戏循环 - 更新部分
-        self.all_sprites.update()
+        # 平台是静态的，只更新玩家和敌人
+        self.player.update()
+        self.enemies.update(self.solid, self.level_width)
 
         # 玩家与平台的碰撞检测 (垂直方向)
         if self.player.vel.y > 0: # 只有在下落时才检测
-            hits = pygame.sprite.spritecollide(self.player, self.platforms, False)
+            hits = self.tilemap.collide_rects(self.player.rect)
             if hits:
                 # 找到玩家脚下最高的平台
                 lowest = hits[0]
                 for hit in hits:
-                    if hit.rect.bottom > lowest.rect.bottom:
+                    if hit.bottom > lowest.bottom:
                         lowest = hit
                 
                 # 如果玩家脚的位置在平台顶部以下
-                if self.player.pos.y < lowest.rect.bottom:
-                    self.player.pos.y = lowest.rect.top + 1
+                if self.player.pos.y < lowest.bottom:
+                    self.player.pos.y = lowest.top + 1
                     self.player.vel.y = 0
 
         # 玩家与平台的碰撞检测 (水平方向)
         # 这个简化版本没有做水平碰撞，可以作为扩展功能添加
 
         # 玩家与敌人的碰撞检测
-        enemy_hits = pygame.sprite.spritecollide(self.player, self.enemies, False)
-        if enemy_hits:
+        enemy_hits = self.enemies.collide(self.player.rect)
+        if len(enemy_hits):
+            first = enemy_hits[0]
             # 如果玩家在敌人上方且正在下落（踩踏）
-            if self.player.vel.y > 0 and self.player.rect.bottom < enemy_hits[0].rect.centery:
-                enemy_hits[0].kill() # 踩死敌人
+            if self.player.vel.y > 0 and self.player.rect.bottom < self.enemies.rect(first).centery:
+                self.enemies.kill(first) # 踩死敌人
             else:
                 self.playing = False # 游戏结束
 
         # 摄像机跟随
-        # 如果玩家移动到屏幕右侧 1/3 处，则移动摄像机
-        if self.player.rect.right >= SCREEN_WIDTH * 2 / 3:
-            self.camera_offset_x = self.player.rect.right - SCREEN_WIDTH * 2 / 3
-            self.player.pos.x -= abs(self.player.vel.x) # 让玩家在屏幕上看起来相对静止
-            
-            # 移动所有其他精灵
-            for sprite in self.all_sprites:
-                if sprite != self.player:
-                    sprite.rect.x -= abs(self.player.vel.x)
+        # 如果玩家移动到屏幕右侧 1/3 处，则移动摄像机（精灵的世界坐标保持不变）
+        self.camera.update(self.player)
+        if self.streaming:
+            self.stream_level()
 
     def events(self):
         # 游戏循环 - 事件处理
@@ -103,7 +141,9 @@ class Game:
     def draw(self):
         # 游戏循环 - 绘制部分
         self.screen.fill(SKY_BLUE)
-        self.all_sprites.draw(self.screen)
+        self.tilemap.draw(self.screen, self.camera.rect)
+        self.enemies.draw(self.screen, self.camera.rect)
+        self.camera.draw(self.screen, [self.player])
         self.draw_text(f"Health: 1", 22, WHITE, SCREEN_WIDTH / 2, 15)
         pygame.display.flip()
 
@@ -138,17 +178,21 @@ class Game:
                     waiting = False
 
     def draw_text(self, text, size, color, x, y):
-        font = pygame.font.Font(pygame.font.match_font('arial'), size) # 使用系统默认字体
-        text_surface = font.render(text, True, color)
+        text_surface = self.text.render(text, size, color) # 字体和渲染结果都有缓存
         text_rect = text_surface.get_rect()
         text_rect.midtop = (x, y)
         self.screen.blit(text_surface, text_rect)
 
 # --- 游戏主程序 ---
-g = Game()
-g.show_start_screen()
-while g.running:
-    g.new()
-    g.show_go_screen()
-
-pygame.quit()
+def main(level_file=LEVEL_FILE):
+    g = Game(level_file)
+    g.show_start_screen()
+    while g.running:
+        g.new()
+        g.show_go_screen()
+
+    pygame.quit()
+
+if __name__ == '__main__':
+    # 可以在命令行指定关卡文件: python main.py long.txt
+    main(*sys.argv[1:2])
@@ -1,10 +1,14 @@
 # settings.py
 
+import os
+
 # 屏幕设置
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FPS = 60
 TITLE = "超级玛丽 (Pygame版)"
+FONT_NAME = 'arial'
+TEXT_CACHE_SIZE = 128 # 最多缓存多少个渲染好的文字表面
 
 # 颜色定义
 BLACK = (0, 0, 0)
@@ -27,23 +31,10 @@ GOOMBA_SPEED = 2
 # 平台尺寸
 TILE_SIZE = 40
 
-# 关卡地图
+# 关卡文件（levels 目录下，格式见上一级目录的 level.py）
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels')
 # P: Platform (平台)
 # G: Goomba (敌人)
-LEVEL_MAP = [
-    "                                        ",
-    "                                        ",
-    "                                        ",
-    "                                        ",
-    "                                        ",
-    "                                        ",
-    "                                        ",
-    "    PPPPPPP          PPPPP              ",
-    "                                        ",
-    "                   PPPPPPPPP            ",
-    "                                        ",
-    "  PPPP       G                          ",
-    "PPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPP",
-    "PPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPP",
-    "PPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPPP",
-]
+LEVEL_FILE = 'level1.txt'
+# long.txt 是生成的长关卡，超过 STREAM_MIN_COLS 列，会以流式加载运行：
+#   python ../level.py --generate 1024 P levels/long.txt
@@ -1,10 +1,13 @@
 import pygame
 import sys
 import random
+import os
 from enum import Enum
 
-# 初始化pygame
-pygame.init()
+# 关卡加载器和数组化的敌人存储是各版本共用的模块，在上一级目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from entities import PatrolStore
+from level import load_level
 
 # 游戏常量
 SCREEN_WIDTH = 800
@@ -24,6 +27,12 @@ YELLOW = (255, 255, 0)
 BLACK = (0, 0, 0)
 SKY_BLUE = (135, 206, 235)
 
+# 关卡文件：levels 目录下的文本文件，由共用的 level.py 加载（格式和编译缓存见该模块）
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels')
+
+def level_path(number):
+    return os.path.join(LEVEL_DIR, f'level{number}.txt')
+
 class GameState(Enum):
     MENU = 1
     PLAYING = 2
@@ -71,10 +80,9 @@ class Player(pygame.sprite.Sprite):
         self.check_collisions(platforms, 'y')
         
         # 检查敌人碰撞
-        enemy_hits = pygame.sprite.spritecollide(self, enemies, False)
-        for enemy in enemy_hits:
-            if self.vel_y > 0 and self.rect.bottom < enemy.rect.top + 20:
-                enemy.kill()
+        for enemy in enemies.collide(self.rect):
+            if self.vel_y > 0 and self.rect.bottom < enemies.y[enemy] + 20:
+                enemies.kill(enemy)
                 self.vel_y = JUMP_STRENGTH / 2
             else:
                 self.lives -= 1
@@ -116,30 +124,10 @@ class Platform(pygame.sprite.Sprite):
         self.rect.x = x
         self.rect.y = y
 
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((30, 30))
-        self.image.fill(GREEN)
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
-        self.vel_x = 2
-        
-    def update(self, platforms):
-        self.rect.x += self.vel_x
-        
-        # 检查平台边缘
-        hits = pygame.sprite.spritecollide(self, platforms, False)
-        if not hits:
-            self.vel_x *= -1
-            
-        # 检查墙壁碰撞
-        for platform in hits:
-            if self.vel_x > 0 and self.rect.right >= platform.rect.right:
-                self.vel_x *= -1
-            elif self.vel_x < 0 and self.rect.left <= platform.rect.left:
-                self.vel_x *= -1
+def enemy_image():
+    image = pygame.Surface((30, 30))
+    image.fill(GREEN)
+    return image
 
 class Coin(pygame.sprite.Sprite):
     def __init__(self, x, y):
@@ -153,6 +141,9 @@ class Coin(pygame.sprite.Sprite):
 
 class Game:
     def __init__(self):
+        # 导入本模块不会初始化 Pygame；创建游戏时只初始化用到的显示和字体子系统
+        pygame.display.init()
+        pygame.font.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("超级玛丽")
         self.clock = pygame.time.Clock()
@@ -163,7 +154,8 @@ class Game:
         
         self.all_sprites = pygame.sprite.Group()
         self.platforms = pygame.sprite.Group()
-        self.enemies = pygame.sprite.Group()
+        # 敌人不是精灵，而是数组化的实体存储，每关按平台重新创建
+        self.enemies = None
         self.coins = pygame.sprite.Group()
         
         self.player = None
@@ -172,81 +164,33 @@ class Game:
         # 清空所有精灵组
         self.all_sprites.empty()
         self.platforms.empty()
-        self.enemies.empty()
         self.coins.empty()
         
         # 创建玩家
         self.player = Player(100, 400)
         self.all_sprites.add(self.player)
         
-        # 创建地面
-        ground = Platform(0, SCREEN_HEIGHT - 40, SCREEN_WIDTH, 40)
-        self.platforms.add(ground)
-        self.all_sprites.add(ground)
-        
-        # 根据关卡创建平台
-        if level == 1:
-            platforms = [
-                Platform(200, 500, 100, 20),
-                Platform(400, 450, 100, 20),
-                Platform(600, 400, 100, 20),
-                Platform(300, 350, 100, 20),
-                Platform(500, 300, 100, 20),
-            ]
-            
-            enemies = [
-                Enemy(250, 470),
-                Enemy(450, 420),
-                Enemy(650, 370),
-            ]
-            
-            coins = [
-                Coin(250, 450),
-                Coin(450, 400),
-                Coin(650, 350),
-                Coin(350, 300),
-                Coin(550, 250),
-            ]
-            
-        elif level == 2:
-            platforms = [
-                Platform(150, 500, 100, 20),
-                Platform(350, 450, 100, 20),
-                Platform(550, 400, 100, 20),
-                Platform(250, 350, 100, 20),
-                Platform(450, 300, 100, 20),
-                Platform(650, 250, 100, 20),
-            ]
-            
-            enemies = [
-                Enemy(200, 470),
-                Enemy(400, 420),
-                Enemy(600, 370),
-                Enemy(300, 320),
-                Enemy(500, 270),
-            ]
-            
-            coins = [
-                Coin(200, 450),
-                Coin(400, 400),
-                Coin(600, 350),
-                Coin(300, 300),
-                Coin(500, 250),
-                Coin(700, 200),
-            ]
-            
-        # 添加平台、敌人和金币到精灵组
-        for platform in platforms:
+        # 读取关卡文件（有编译缓存时直接解码），合并后的矩形就是平台
+        level_data = load_level(level_path(level))
+        size = level_data.tile_size
+        for char, col, row, w, h in level_data.colliders:
+            platform = Platform(col * size, row * size, w * size, h * size)
             self.platforms.add(platform)
             self.all_sprites.add(platform)
+        # 敌人在平台上巡逻，掉出屏幕就移除
+        self.enemies = PatrolStore(enemy_image(), [p.rect for p in self.platforms], SCREEN_HEIGHT, GRAVITY)
             
-        for enemy in enemies:
-            self.enemies.add(enemy)
-            self.all_sprites.add(enemy)
-            
-        for coin in coins:
-            self.coins.add(coin)
-            self.all_sprites.add(coin)
+        # 按出生表放置玩家、创建敌人和金币
+        for kind, x, y in level_data.spawns:
+            if kind == 'player':
+                self.player.rect.topleft = (x, y)
+            elif kind == 'enemy':
+                # 平台已经全部创建，生成时直接算好巡逻范围
+                self.enemies.spawn(x, y, 2)
+            elif kind == 'coin':
+                coin = Coin(x, y)
+                self.coins.add(coin)
+                self.all_sprites.add(coin)
             
     def handle_events(self):
         for event in pygame.event.get():
@@ -267,7 +211,7 @@ class Game:
                 elif self.game_state == GameState.LEVEL_COMPLETE:
                     if event.key == pygame.K_SPACE:
                         self.level += 1
-                        if self.level > 2:
+                        if not os.path.exists(level_path(self.level)):
                             self.game_state = GameState.MENU
                             self.level = 1
                         else:
@@ -279,7 +223,7 @@ class Game:
     def update(self):
         if self.game_state == GameState.PLAYING:
             # 更新所有精灵
-            self.enemies.update(self.platforms)
+            self.enemies.update()
             died = self.player.update(self.platforms, self.enemies, self.coins)
             
             # 检查游戏结束
@@ -297,6 +241,7 @@ class Game:
             self.draw_menu()
         elif self.game_state == GameState.PLAYING:
             self.all_sprites.draw(self.screen)
+            self.enemies.draw(self.screen, self.screen.get_rect())
             self.draw_hud()
         elif self.game_state == GameState.GAME_OVER:
             self.draw_game_over()
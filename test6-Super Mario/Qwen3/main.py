@@ -1,9 +1,11 @@
+import os
 import pygame
 import sys
 import random
 
-# 初始化Pygame
-pygame.init()
+# 数组化的实体存储是各版本共用的模块，在上一级目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from entities import EntityStore
 
 # 游戏常量
 SCREEN_WIDTH = 800
@@ -20,10 +22,18 @@ YELLOW = (255, 255, 0)
 BLACK = (0, 0, 0)
 SKY_BLUE = (135, 206, 235)
 
-# 创建游戏窗口
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("超级玛丽游戏")
-clock = pygame.time.Clock()
+# 窗口和时钟在 init_display() 中创建，导入本模块不会初始化 Pygame 或打开窗口
+screen = None
+clock = None
+
+def init_display():
+    global screen, clock
+    # 只初始化用到的显示和字体子系统
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("超级玛丽游戏")
+    clock = pygame.time.Clock()
 
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y):
@@ -88,40 +98,19 @@ class Platform(pygame.sprite.Sprite):
         self.rect.x = x
         self.rect.y = y
 
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((25, 25))
-        self.image.fill(BROWN)
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
-        self.speed = 2
-        self.direction = 1
-        
-    def update(self):
-        self.rect.x += self.speed * self.direction
-        
-        # 边界反弹
-        if self.rect.left <= 0 or self.rect.right >= SCREEN_WIDTH:
-            self.direction *= -1
-
-class Coin(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((15, 15))
-        self.image.fill(YELLOW)
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
+def solid_image(width, height, color):
+    image = pygame.Surface((width, height))
+    image.fill(color)
+    return image
 
 class Game:
     def __init__(self):
         self.player = Player(100, 300)
         self.all_sprites = pygame.sprite.Group()
         self.platforms = pygame.sprite.Group()
-        self.enemies = pygame.sprite.Group()
-        self.coins = pygame.sprite.Group()
+        # 敌人和金币不是精灵，而是数组化的实体存储
+        self.enemies = EntityStore(solid_image(25, 25, BROWN))
+        self.coins = EntityStore(solid_image(15, 15, YELLOW))
         
         self.all_sprites.add(self.player)
         
@@ -167,9 +156,7 @@ class Game:
         ]
         
         for x, y in enemies_data:
-            enemy = Enemy(x, y)
-            self.enemies.add(enemy)
-            self.all_sprites.add(enemy)
+            self.enemies.spawn(x, y, 2)
     
     def create_coins(self):
         coins_data = [
@@ -182,9 +169,7 @@ class Game:
         ]
         
         for x, y in coins_data:
-            coin = Coin(x, y)
-            self.coins.add(coin)
-            self.all_sprites.add(coin)
+            self.coins.spawn(x, y)
     
     def handle_collisions(self):
         # 平台碰撞检测
@@ -200,15 +185,14 @@ class Game:
                 self.player.vel_y = 0
         
         # 敌人碰撞检测
-        enemy_hits = pygame.sprite.spritecollide(self.player, self.enemies, False)
-        if enemy_hits:
+        if len(self.enemies.collide(self.player.rect)):
             # 简单的碰撞处理：游戏结束
             self.game_over = True
         
         # 金币收集检测
-        coin_hits = pygame.sprite.spritecollide(self.player, self.coins, True)
-        for coin in coin_hits:
-            self.player.score += 10
+        coin_hits = self.coins.collide(self.player.rect)
+        self.coins.kill(coin_hits)
+        self.player.score += 10 * len(coin_hits)
         
         # 检查是否获胜（收集所有金币）
         if len(self.coins) == 0:
@@ -217,6 +201,8 @@ class Game:
     def update(self):
         if not self.game_over and not self.win:
             self.all_sprites.update()
+            # 敌人不与平台碰撞，只在屏幕左右边界掉头
+            self.enemies.update(None, SCREEN_WIDTH)
             self.handle_collisions()
     
     def draw(self):
@@ -225,6 +211,9 @@ class Game:
         
         # 绘制所有精灵
         self.all_sprites.draw(screen)
+        view = screen.get_rect()
+        self.enemies.draw(screen, view)
+        self.coins.draw(screen, view)
         
         # 绘制UI
         score_text = self.font.render(f"分数: {self.player.score}", True, BLACK)
@@ -251,6 +240,7 @@ class Game:
         self.__init__()
 
 def main():
+    init_display()
     game = Game()
     running = True
     
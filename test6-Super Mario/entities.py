@@ -0,0 +1,308 @@
+# entities.py
+# 数组化的实体存储：同一种实体的位置、速度和存活标记保存在连续的 NumPy 数组中，
+# 每帧用一次向量化计算推进全部实体，代替每个实体一个 Sprite 和一次 update() 调用
+# 各版本共用的模块，不依赖任何版本的设置
+# 用法: python entities.py [数量 ...]   测量批量更新和绘制的耗时
+
+import sys
+import time
+import numpy as np
+import pygame
+
+class SolidGrid:
+    # 关卡实心格子的布尔数组，可以一次查询很多个矩形；地图之外视为空
+    # origin_col 为网格左边界所在的世界列（流式加载时只覆盖已加载的窗口）
+    def __init__(self, grid, solid, tile_size, origin_col=0):
+        self.tile_size = tile_size
+        self.origin_col = origin_col
+        rows, cols = len(grid), len(grid[0])
+        tiles = np.frombuffer(''.join(grid).encode('latin-1'), dtype=np.uint8).reshape(rows, cols)
+        mask = np.isin(tiles, np.frombuffer(solid.encode('latin-1'), dtype=np.uint8))
+        # 四周补一圈空格，越界的下标被裁剪到这一圈上
+        self.mask = np.pad(mask, 1)
+
+    def set_tile(self, col, row, solid):
+        self.mask[row + 1, col - self.origin_col + 1] = solid
+
+    def overlaps(self, x, y, w, h):
+        # x, y 为矩形左上角的数组；w, h 不超过一个格子，所以每个矩形最多覆盖 2x2 个格子
+        size = self.tile_size
+        rows, cols = self.mask.shape
+        first = self.origin_col - 1
+        left = np.clip(x // size - first, 0, cols - 1)
+        right = np.clip((x + w - 1) // size - first, 0, cols - 1)
+        top = np.clip(y // size + 1, 0, rows - 1)
+        bottom = np.clip((y + h - 1) // size + 1, 0, rows - 1)
+        mask = self.mask
+        return mask[top, left] | mask[top, right] | mask[bottom, left] | mask[bottom, right]
+
+def patrol_span(rect, solids):
+    # 巡逻范围 (左, 右)：rect 脚下的平台面（同一高度、首尾相接的矩形连成一个面），
+    # 再被同一高度上挡路的矩形截断；solids 为平台的矩形列表，脚下没有平台时返回 None
+    surface = [r for r in solids if r.top == rect.bottom]
+    support = [r for r in surface if r.left < rect.right and r.right > rect.left]
+    if not support:
+        return None
+    left = min(r.left for r in support)
+    right = max(r.right for r in support)
+    grown = True
+    while grown:
+        grown = False
+        for r in surface:
+            if r.left <= right and r.right >= left and (r.left < left or r.right > right):
+                left, right = min(left, r.left), max(right, r.right)
+                grown = True
+    for r in solids:
+        if r.top < rect.bottom and r.bottom > rect.top:
+            if r.right <= rect.left:
+                left = max(left, r.right)
+            elif r.left >= rect.right:
+                right = min(right, r.left)
+    return left, right
+
+class EntityStore:
+    # 同一种实体（同样大小、共用一张图像）的集合，第 i 个实体为 x[i], y[i], vx[i], alive[i]
+    # 被消灭的实体只清除 alive 标记，死槽位超过一半时再整体压缩（压缩保持原有顺序）
+    # size 为碰撞矩形的大小，默认和图像一样大；offset 为图像相对碰撞矩形左上角的偏移
+    ARRAYS = ('x', 'y', 'vx', 'alive')
+
+    def __init__(self, image, capacity=64, size=None, offset=(0, 0)):
+        self.image = image
+        self.w, self.h = size or image.get_size()
+        self.offset = offset
+        self.count = 0  # 已使用的槽位数（含死槽位）
+        self.live = 0   # 存活的实体数
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.vx = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return self.live
+
+    def _reserve(self, extra):
+        capacity = len(self.x)
+        if self.count + extra <= capacity:
+            return
+        while capacity < self.count + extra:
+            capacity *= 2
+        for name in self.ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def spawn(self, x, y, vx=0):
+        self._reserve(1)
+        i = self.count
+        self.x[i], self.y[i], self.vx[i] = x, y, vx
+        self.alive[i] = True
+        self.count += 1
+        self.live += 1
+        return i
+
+    def spawn_many(self, xs, ys, vx=0):
+        n = len(xs)
+        self._reserve(n)
+        span = slice(self.count, self.count + n)
+        self.x[span] = xs
+        self.y[span] = ys
+        self.vx[span] = vx
+        self.alive[span] = True
+        self.count += n
+        self.live += n
+
+    def kill(self, indices):
+        # indices 可以是单个下标，也可以是 collide() 返回的下标数组
+        self.live -= int(np.count_nonzero(self.alive[indices]))
+        self.alive[indices] = False
+
+    def kill_outside(self, left, right):
+        # 移除完全落在 [left, right) 之外的实体
+        n = self.count
+        x = self.x[:n]
+        outside = self.alive[:n] & ((x + self.w <= left) | (x >= right))
+        self.alive[:n] &= ~outside
+        self.live -= int(np.count_nonzero(outside))
+
+    def compact(self):
+        keep = np.flatnonzero(self.alive[:self.count])
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+        self.alive[len(keep):self.count] = False
+        self.count = len(keep)
+
+    def rect(self, i):
+        return pygame.Rect(int(self.x[i]), int(self.y[i]), self.w, self.h)
+
+    def collide(self, rect):
+        # 与 rect 重叠的存活实体下标，按生成顺序排列
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        hit = (self.alive[:n] & (x < rect.right) & (x + self.w > rect.left)
+               & (y < rect.bottom) & (y + self.h > rect.top))
+        return np.flatnonzero(hit)
+
+    def bounds(self):
+        # 所有存活实体的外接矩形（按图像计算），没有实体时返回 None
+        n = self.count
+        alive = self.alive[:n]
+        if not alive.any():
+            return None
+        x, y = self.x[:n][alive] + self.offset[0], self.y[:n][alive] + self.offset[1]
+        left, top = int(x.min()), int(y.min())
+        w, h = self.image.get_size()
+        return pygame.Rect(left, top, int(x.max()) + w - left, int(y.max()) + h - top)
+
+    def update(self, solid, level_width):
+        # 全部行走的实体一起前进一步：碰到实心瓦片就退回原位并掉头，走出关卡左右边界也掉头
+        # solid 为 None 时不检查瓦片，只在关卡边界掉头
+        n = self.count
+        x, vx = self.x[:n], self.vx[:n]
+        x += vx
+        turn = (x + self.w > level_width) | (x < 0)
+        if solid is not None:
+            blocked = solid.overlaps(x, self.y[:n], self.w, self.h)
+            x -= np.where(blocked, vx, 0)
+            turn |= blocked
+        vx[turn] *= -1
+        if self.count - self.live > self.count // 2:
+            self.compact()
+
+    def draw(self, surface, view):
+        # 只绘制与视口相交的实体，整批交给一次 blits
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        visible = np.flatnonzero(self.alive[:n] & (x < view.right) & (x + self.w > view.left)
+                                 & (y < view.bottom) & (y + self.h > view.top))
+        image = self.image
+        dx, dy = self.offset[0] - view.x, self.offset[1] - view.y
+        surface.blits([(image, pos) for pos in zip((x[visible] + dx).tolist(),
+                                                   (y[visible] + dy).tolist())], False)
+
+class PatrolStore(EntityStore):
+    # 在平台上来回巡逻的实体：第 i 个实体在自己的巡逻范围 [left[i], right[i]) 内行走，走到尽头就掉头；
+    # 脚下没有平台的实体（falling[i]）受重力下落，落到平台上后重新计算巡逻范围，掉到 fall_limit 以下就移除
+    # solids 为静态平台的矩形列表，巡逻范围只在生成和落地时用 patrol_span 计算一次
+    ARRAYS = EntityStore.ARRAYS + ('left', 'right', 'vy', 'falling')
+
+    def __init__(self, image, solids, fall_limit, gravity, capacity=64, size=None, offset=(0, 0)):
+        super().__init__(image, capacity, size, offset)
+        self.solids = list(solids)
+        # 平台的 左、上、右 边，落地检测时一次和全部平台比较
+        self.solid_left = np.array([r.left for r in self.solids], dtype=np.int32)
+        self.solid_top = np.array([r.top for r in self.solids], dtype=np.int32)
+        self.solid_right = np.array([r.right for r in self.solids], dtype=np.int32)
+        self.fall_limit = fall_limit
+        self.gravity = gravity
+        self.left = np.zeros(capacity, dtype=np.int32)
+        self.right = np.zeros(capacity, dtype=np.int32)
+        self.vy = np.zeros(capacity)
+        self.falling = np.zeros(capacity, dtype=bool)
+
+    def _find_patrol(self, i):
+        span = patrol_span(self.rect(i), self.solids)
+        self.falling[i] = span is None
+        if span is not None:
+            self.left[i], self.right[i] = span
+
+    def spawn(self, x, y, vx=0):
+        i = super().spawn(x, y, vx)
+        self.vy[i] = 0
+        self._find_patrol(i)
+        return i
+
+    def spawn_many(self, xs, ys, vx=0):
+        start = self.count
+        super().spawn_many(xs, ys, vx)
+        self.vy[start:self.count] = 0
+        for i in range(start, self.count):
+            self._find_patrol(i)
+
+    def update(self):
+        n = self.count
+        alive = self.alive[:n]
+        walking = alive & ~self.falling[:n]
+        x, vx = self.x[:n], self.vx[:n]
+        x += np.where(walking, vx, 0)
+        left, right = self.left[:n], self.right[:n]
+        at_left = walking & (x <= left)
+        at_right = walking & ~at_left & (x + self.w >= right)
+        x[at_left] = left[at_left]
+        vx[at_left] = np.abs(vx[at_left])
+        x[at_right] = right[at_right] - self.w
+        vx[at_right] = -np.abs(vx[at_right])
+        falling = np.flatnonzero(alive & self.falling[:n])
+        if len(falling):
+            self._fall(falling)
+        if self.count - self.live > self.count // 2:
+            self.compact()
+
+    def _fall(self, indices):
+        # 每帧至少下落 1 像素；这一步跨过的平台顶面中最高的一个就是落脚点
+        vy = self.vy[indices] + self.gravity
+        self.vy[indices] = vy
+        bottom = self.y[indices] + self.h
+        step = np.maximum(vy.astype(np.int32), 1)
+        x = self.x[indices][:, None]
+        hit = ((self.solid_left < x + self.w) & (self.solid_right > x)
+               & (bottom[:, None] <= self.solid_top) & (self.solid_top <= (bottom + step)[:, None]))
+        floor = np.iinfo(np.int32).max
+        top = np.where(hit, self.solid_top, floor).min(axis=1, initial=floor)
+        landed = top < floor
+        self.y[indices] = np.where(landed, top - self.h, bottom - self.h + step)
+        for i in indices[landed]:
+            self.vy[i] = 0
+            self._find_patrol(i)
+        gone = indices[~landed & (self.y[indices] > self.fall_limit)]
+        if len(gone):
+            self.kill(gone)
+
+if __name__ == '__main__':
+    # 一条很长的地面，每隔 8 格一根柱子，敌人在柱子之间来回走
+    counts = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000, 100000]
+    frames = 600
+    size = 40
+    view = pygame.Rect(0, 0, 800, 600)
+    for count in counts:
+        cols = max(count, 64)
+        row = ''.join('P' if col % 8 == 0 else ' ' for col in range(cols))
+        grid = [' ' * cols] * 13 + [row, 'P' * cols]
+        solid = SolidGrid(grid, 'P', size)
+        store = EntityStore(pygame.Surface((size - 5, size - 5)))
+        rng = np.random.default_rng(0)
+        cells = rng.integers(0, cols // 8, count) * 8
+        store.spawn_many(cells * size + size + 1, np.full(count, 13 * size + 5), 2)
+        start = time.perf_counter()
+        for _ in range(frames):
+            store.update(solid, cols * size)
+        elapsed = (time.perf_counter() - start) / frames
+        surface = pygame.Surface(view.size)
+        start = time.perf_counter()
+        for _ in range(frames):
+            store.draw(surface, view)
+        drawn = (time.perf_counter() - start) / frames
+        print(f"{count:>7} 个敌人: 更新 {elapsed * 1000:.3f} ms/帧, 绘制(一屏) {drawn * 1000:.3f} ms/帧")
+
+    # 一屏大小的关卡：地面加几块悬空平台，一半敌人站在地面上，另一半从空中落到平台上再巡逻
+    platforms = [pygame.Rect(0, 550, 800, 50)] + [pygame.Rect(x, y, 150, 20) for x, y in
+                                                  ((100, 450), (300, 350), (500, 250), (250, 150), (600, 450))]
+    for count in counts:
+        store = PatrolStore(pygame.Surface((30, 30)), platforms, view.height, 0.8)
+        rng = np.random.default_rng(0)
+        start = time.perf_counter()
+        store.spawn_many(rng.integers(0, 770, count),
+                         np.where(np.arange(count) % 2, 520, rng.integers(0, 400, count)), 2)
+        spawned = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(frames):
+            store.update()
+        elapsed = (time.perf_counter() - start) / frames
+        surface = pygame.Surface(view.size)
+        start = time.perf_counter()
+        for _ in range(frames):
+            store.draw(surface, view)
+        drawn = (time.perf_counter() - start) / frames
+        print(f"{count:>7} 个巡逻敌人: 生成 {spawned * 1000:.1f} ms, 更新 {elapsed * 1000:.3f} ms/帧, "
+              f"绘制(全在屏幕内) {drawn * 1000:.3f} ms/帧")
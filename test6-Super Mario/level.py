@@ -0,0 +1,342 @@
+# level.py
+# 关卡文件：文本格式的瓦片网格 + 实体层，第一次加载时编译成紧凑的二进制缓存
+# （瓦片数组、合并后的碰撞矩形、实体出生表），缓存放在关卡所在目录的 __pycache__ 中，按内容哈希失效
+# 瓦片和出生点在缓存中按窗口（LEVEL_WINDOW 列）分块存放，很长的关卡可以只读入摄像机附近的窗口
+# 各版本共用这一个加载器，关卡文件放在各自的 levels 目录下，由调用方给出路径
+# 用法: python level.py 关卡文件                            对比重新编译和读取缓存的耗时
+#       python level.py --generate 列数 实心字符 输出文件   生成一个很长的关卡，用来测试流式加载
+
+import hashlib
+import io
+import os
+import random
+import struct
+import sys
+import threading
+import time
+import zlib
+from tilemap import CHUNK_TILES, merge_tiles
+
+LEVEL_MAGIC = b'MLVL'
+LEVEL_VERSION = 3
+# 每个窗口的列数，和瓦片地图的区块一样宽
+LEVEL_WINDOW = CHUNK_TILES
+# 文件头：魔数、版本、布局校验、源文件 SHA-1、格子大小、列数、行数、窗口列数
+LEVEL_HEADER = struct.Struct('<4sHI20sHHHH')
+COUNT = struct.Struct('<I')
+STRING = struct.Struct('<H')
+# 碰撞矩形：瓦片字符、列、行、宽、高（单位为格）
+COLLIDER = struct.Struct('<cHHHH')
+# 实体：类型下标、x、y（像素）
+SPAWN = struct.Struct('<Hii')
+# 布局校验：所有结构格式串的 CRC32 写在文件头里，改了布局却忘了提升
+# LEVEL_VERSION 时，旧缓存会被当作过期重新编译，而不会被误读
+LEVEL_LAYOUT = zlib.crc32('|'.join(s.format for s in
+                                   (LEVEL_HEADER, COUNT, STRING, COLLIDER, SPAWN)).encode())
+# 缓存布局：
+#   文件头 | 实心字符 | 可破坏字符 | 实体类型表
+#   窗口索引：窗口数 + 1 个 COUNT，第 i 个窗口的出生点是出生表中 [索引[i], 索引[i + 1]) 这一段
+#   碰撞矩形：整关合并的结果，只有一次读入整个关卡时才用到
+#   瓦片：每个窗口一块，块内逐行存放 行数 x LEVEL_WINDOW 个字节（最后一个窗口用空格补齐）
+#   出生表：按所在窗口排序
+
+class LevelError(Exception):
+    pass
+
+class Level:
+    # 编译好的关卡；grid 为等长的字符串行，实体标记已从网格中移除
+    def __init__(self, tile_size, grid, solid, breakable, colliders, spawns):
+        self.tile_size = tile_size
+        self.grid = grid
+        self.solid = solid
+        self.breakable = breakable
+        self.colliders = colliders  # [(瓦片字符, 列, 行, 宽, 高)]
+        self.spawns = spawns        # [(类型, x, y)]
+
+def parse_level(text):
+    # 文件结构：
+    #   头部指令  tile_size 40 / solid P / breakable B / entity G goomba
+    #   [map]      瓦片网格，每行一行字符，entity 声明过的字符是实体标记
+    #   [entities] 每行 "类型 x y"，像素坐标，用于不对齐格子的实体
+    # 头部和实体层中 # 之后是注释；网格中的字符原样保留
+    tile_size = 40
+    solid = ''
+    breakable = ''
+    legend = {}
+    grid = []
+    spawns = []
+    section = None
+    for number, line in enumerate(text.splitlines(), 1):
+        if line.startswith('['):
+            section = line.strip()
+            if section not in ('[map]', '[entities]'):
+                raise LevelError(f"第 {number} 行: 未知的段 {section}")
+            continue
+        if section == '[map]':
+            grid.append(line.rstrip())
+            continue
+        parts = line.split('#', 1)[0].split()
+        if not parts:
+            continue
+        try:
+            if section == '[entities]':
+                kind, x, y = parts
+                spawns.append((kind, int(x), int(y)))
+            elif parts[0] == 'tile_size':
+                tile_size = int(parts[1])
+            elif parts[0] == 'solid':
+                solid += ''.join(parts[1:])
+            elif parts[0] == 'breakable':
+                breakable += ''.join(parts[1:])
+            elif parts[0] == 'entity':
+                legend[parts[1]] = parts[2]
+            else:
+                raise LevelError(f"第 {number} 行: 未知的指令 {parts[0]}")
+        except (ValueError, IndexError):
+            raise LevelError(f"第 {number} 行格式错误: {line.strip()}")
+    while grid and not grid[-1]:
+        grid.pop()
+    if not grid:
+        raise LevelError("关卡缺少 [map] 段")
+    return tile_size, grid, solid, breakable, legend, spawns
+
+def compile_level(text):
+    tile_size, rows, solid, breakable, legend, spawns = parse_level(text)
+    cols = max(len(row) for row in rows)
+    grid = []
+    for row_index, row in enumerate(rows):
+        line = list(row.ljust(cols))
+        for col_index, char in enumerate(line):
+            if char in legend:
+                # 实体标记转换成出生表中的像素坐标（格子左上角）
+                spawns.append((legend[char], col_index * tile_size, row_index * tile_size))
+                line[col_index] = ' '
+            elif ord(char) > 0xFF:
+                raise LevelError(f"第 {row_index + 1} 行地图含有无法编码的字符 {char!r}")
+        grid.append(''.join(line))
+    colliders = merge_tiles(grid, set(solid), set(breakable))
+    return Level(tile_size, grid, solid, breakable, colliders, spawns)
+
+def _pack_string(text):
+    data = text.encode('utf-8')
+    return STRING.pack(len(data)) + data
+
+def _read(file, layout):
+    # 读取一个结构；文件提前结束时 unpack 抛出 struct.error
+    return layout.unpack(file.read(layout.size))
+
+def _read_string(file):
+    (length,) = _read(file, STRING)
+    return file.read(length).decode('utf-8')
+
+def window_count(cols):
+    return (cols + LEVEL_WINDOW - 1) // LEVEL_WINDOW
+
+def level_to_bytes(level, digest):
+    rows = len(level.grid)
+    cols = len(level.grid[0])
+    windows = window_count(cols)
+    out = bytearray(LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, LEVEL_LAYOUT, digest,
+                                      level.tile_size, cols, rows, LEVEL_WINDOW))
+    out += _pack_string(level.solid) + _pack_string(level.breakable)
+    kinds = sorted({kind for kind, _, _ in level.spawns})
+    out += COUNT.pack(len(kinds))
+    for kind in kinds:
+        out += _pack_string(kind)
+    index = {kind: i for i, kind in enumerate(kinds)}
+
+    # 出生点按所在窗口排序（同一窗口内保持原有顺序），关卡之外的归到最近的窗口
+    width = LEVEL_WINDOW * level.tile_size
+    window_of = lambda x: min(max(x // width, 0), windows - 1)
+    spawns = sorted(level.spawns, key=lambda spawn: window_of(spawn[1]))
+    starts = [0] * (windows + 1)
+    for _, x, _ in spawns:
+        starts[window_of(x) + 1] += 1
+    for window in range(windows):
+        starts[window + 1] += starts[window]
+    for start in starts:
+        out += COUNT.pack(start)
+
+    out += COUNT.pack(len(level.colliders))
+    for char, col, row, w, h in level.colliders:
+        out += COLLIDER.pack(char.encode('latin-1'), col, row, w, h)
+    # 瓦片：每格一个字节
+    for window in range(windows):
+        left = window * LEVEL_WINDOW
+        out += ''.join(row[left:left + LEVEL_WINDOW].ljust(LEVEL_WINDOW)
+                       for row in level.grid).encode('latin-1')
+    for kind, x, y in spawns:
+        out += SPAWN.pack(index[kind], x, y)
+    return bytes(out)
+
+class LevelFile:
+    # 打开的关卡缓存：常驻内存的只有文件头和实体类型表，瓦片和出生点都按窗口从文件中读取，
+    # 所以流式加载时的内存与关卡长度无关；read_window 可以在后台线程中调用（读文件由锁保护）
+    # 缓存与源文件不一致（哈希、版本或布局不同）或已损坏时抛出 LevelError
+    def __init__(self, file, digest):
+        self.file = file
+        self.lock = threading.Lock()
+        (magic, version, layout, cached_digest, self.tile_size, self.cols, self.rows,
+         window) = _read(file, LEVEL_HEADER)
+        if magic != LEVEL_MAGIC:
+            raise LevelError("不是关卡缓存文件")
+        if (version != LEVEL_VERSION or layout != LEVEL_LAYOUT or cached_digest != digest
+                or window != LEVEL_WINDOW):
+            raise LevelError("关卡缓存已过期")
+        self.solid = _read_string(file)
+        self.breakable = _read_string(file)
+        (count,) = _read(file, COUNT)
+        self.kinds = [_read_string(file) for _ in range(count)]
+        self.window_count = window_count(self.cols)
+        # 其余各段的位置都可以由数量算出来
+        self.index_pos = file.tell()
+        file.seek(self.index_pos + self.window_count * COUNT.size)
+        (spawn_count,) = _read(file, COUNT)  # 窗口索引的最后一项即出生点总数
+        (self.collider_count,) = _read(file, COUNT)
+        self.collider_pos = file.tell()
+        self.block_size = self.rows * LEVEL_WINDOW
+        self.tile_pos = self.collider_pos + self.collider_count * COLLIDER.size
+        self.spawn_pos = self.tile_pos + self.window_count * self.block_size
+        if file.seek(0, io.SEEK_END) != self.spawn_pos + spawn_count * SPAWN.size:
+            raise LevelError("关卡缓存长度不正确")
+
+    def _read_at(self, pos, size):
+        with self.lock:
+            self.file.seek(pos)
+            return self.file.read(size)
+
+    def read_spawns(self, index):
+        start, end = (value for (value,) in
+                      COUNT.iter_unpack(self._read_at(self.index_pos + index * COUNT.size, 2 * COUNT.size)))
+        data = self._read_at(self.spawn_pos + start * SPAWN.size, (end - start) * SPAWN.size)
+        return [(self.kinds[kind], x, y) for kind, x, y in SPAWN.iter_unpack(data)]
+
+    def read_window(self, index):
+        # 第 index 个窗口的瓦片行（每行 LEVEL_WINDOW 个字符）和其中的出生点
+        data = self._read_at(self.tile_pos + index * self.block_size, self.block_size).decode('latin-1')
+        rows = [data[row * LEVEL_WINDOW:(row + 1) * LEVEL_WINDOW] for row in range(self.rows)]
+        return rows, self.read_spawns(index)
+
+    def find_spawn(self, kind):
+        # 按窗口顺序查找第一个该类型的出生点，没有时返回 None
+        if kind in self.kinds:
+            for index in range(self.window_count):
+                for spawn_kind, x, y in self.read_spawns(index):
+                    if spawn_kind == kind:
+                        return x, y
+        return None
+
+    def load(self):
+        # 一次读入整个关卡
+        data = self._read_at(self.collider_pos, self.collider_count * COLLIDER.size)
+        colliders = [(char.decode('latin-1'), col, row, w, h)
+                     for char, col, row, w, h in COLLIDER.iter_unpack(data)]
+        windows = [self.read_window(index) for index in range(self.window_count)]
+        grid = [''.join(rows[row] for rows, _ in windows)[:self.cols] for row in range(self.rows)]
+        spawns = [spawn for _, window_spawns in windows for spawn in window_spawns]
+        return Level(self.tile_size, grid, self.solid, self.breakable, colliders, spawns)
+
+    def close(self):
+        self.file.close()
+
+def cache_path(path):
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, '__pycache__', os.path.splitext(name)[0] + '.lvlc')
+
+def _hash_file(path):
+    # 分块计算源文件的 SHA-1，不必把整个文件读进内存
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.digest()
+
+def open_level(path, use_cache=True):
+    # 打开关卡，返回 LevelFile；缓存有效时直接打开缓存，否则重新编译并写入缓存
+    digest = _hash_file(path)
+    cache = cache_path(path)
+    if use_cache:
+        file = None
+        try:
+            file = open(cache, 'rb')
+            return LevelFile(file, digest)
+        except (OSError, struct.error, LevelError, UnicodeDecodeError):
+            if file is not None:
+                file.close() # 缓存缺失或损坏，重新编译
+
+    with open(path, 'rb') as f:
+        level = compile_level(f.read().decode('utf-8'))
+    data = level_to_bytes(level, digest)
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        temp = cache + '.tmp'
+        with open(temp, 'wb') as f:
+            f.write(data)
+        os.replace(temp, cache)
+        return LevelFile(open(cache, 'rb'), digest)
+    except OSError:
+        return LevelFile(io.BytesIO(data), digest) # 目录只读时缓存只留在内存里
+
+def load_level(path, use_cache=True):
+    # 一次读入整个关卡，返回 Level
+    level_file = open_level(path, use_cache)
+    try:
+        return level_file.load()
+    finally:
+        level_file.close()
+
+def generate_level(cols, solid, rows=15, tile_size=40, seed=0):
+    # 生成一个很长的关卡文本：最下面两行是地面（随机留出缺口），上方随机放一些悬空平台，
+    # 地面上每隔一段站着一个 goomba，玩家从左边出发
+    rng = random.Random(seed)
+    grid = [[' '] * cols for _ in range(rows)]
+    spawns = [('player', 3 * tile_size, (rows - 4) * tile_size)]
+    col = 0
+    while col < cols:
+        if col > 12 and rng.random() < 0.1:
+            col += rng.randint(2, 3) # 缺口
+            continue
+        grid[rows - 2][col] = grid[rows - 1][col] = solid
+        if col > 12 and col % 10 == 0:
+            spawns.append(('goomba', col * tile_size, (rows - 3) * tile_size))
+        col += 1
+    for left in range(16, cols - 8, 12):
+        left += rng.randint(0, 4)
+        row = rows - rng.choice((6, 8))
+        for col in range(left, min(left + rng.randint(3, 6), cols)):
+            grid[row][col] = solid
+    return '\n'.join([f"# 由 level.py --generate 生成的长关卡（{cols} 列），用于测试流式加载",
+                      f"tile_size {tile_size}",
+                      f"solid {solid}",
+                      "",
+                      "[map]",
+                      *(''.join(row) for row in grid),
+                      "",
+                      "[entities]",
+                      *(f"{kind} {x} {y}" for kind, x, y in spawns)]) + '\n'
+
+if __name__ == '__main__':
+    if len(sys.argv) == 5 and sys.argv[1] == '--generate':
+        _, _, cols, solid, path = sys.argv
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(generate_level(int(cols), solid))
+        sys.exit()
+    if len(sys.argv) != 2:
+        sys.exit("用法: python level.py 关卡文件\n      python level.py --generate 列数 实心字符 输出文件")
+    path = sys.argv[1]
+    start = time.perf_counter()
+    level = load_level(path, use_cache=False)
+    compiled = time.perf_counter() - start
+    start = time.perf_counter()
+    load_level(path)
+    cached = time.perf_counter() - start
+    start = time.perf_counter()
+    level_file = open_level(path)
+    level_file.read_window(level_file.window_count // 2)
+    level_file.close()
+    windowed = time.perf_counter() - start
+    tiles = sum(len(row) - row.count(' ') for row in level.grid)
+    print(f"{path}: {len(level.grid[0])}x{len(level.grid)} 格, {tiles} 个瓦片 -> "
+          f"{len(level.colliders)} 个碰撞矩形, {len(level.spawns)} 个实体")
+    print(f"编译 {compiled * 1000:.2f} ms, 读取缓存 {cached * 1000:.2f} ms, "
+          f"只读一个窗口 {windowed * 1000:.2f} ms")
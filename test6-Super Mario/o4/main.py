@@ -1,41 +1,31 @@
-import pygame
+import os
 import sys
 
+import pygame
+
+# 瓦片地图和关卡加载器是各版本共用的模块，在上一级目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from level import open_level
+from tilemap import STREAM_MIN_COLS, StreamingTileMap, TileMap
+
 # —— 常量定义 —— #
 WIDTH, HEIGHT = 800, 600      # 窗口大小
 FPS = 60                      # 帧率
-TILESIZE = 40                 # 格子大小
 GRAVITY = 0.5                 # 重力加速度
 JUMP_SPEED = -10              # 跳跃初速度
 PLAYER_SPEED = 5              # 水平移动速度
 
-# 简单关卡地图，'X' 表示砖块，'P' 表示玩家起点，其它空格
-LEVEL_MAP = [
-    "                                                                                ",
-    "                                                                                ",
-    "                                                                                ",
-    "                                                                                ",
-    "         P                                                                      ",
-    "    XXXXXXXXXXXXX                                  XXXXXXX                     ",
-    "                                                                                ",
-    "                                          XXXX                                  ",
-    "                           XXXX                                               ",
-    "           XXXX                                                               ",
-    "                                                                                ",
-    "XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX",
-]
-
 # —— 精灵定义 —— #
 class Player(pygame.sprite.Sprite):
-    def __init__(self, x, y, blocks_group):
+    def __init__(self, x, y, tilemap):
         super().__init__()
-        self.image = pygame.Surface((TILESIZE, TILESIZE))
+        self.image = pygame.Surface((tilemap.tile_size, tilemap.tile_size))
         self.image.fill((200, 50, 50))  # 红色方块代表马里奥
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
         self.vel_x = 0
         self.vel_y = 0
-        self.blocks = blocks_group
+        self.tilemap = tilemap
         self.on_ground = False
 
     def handle_input(self):
@@ -55,66 +45,68 @@ class Player(pygame.sprite.Sprite):
 
         # 重力
         self.vel_y += GRAVITY
-        if self.vel_y > TILESIZE:  # 限制最大下落速度
-            self.vel_y = TILESIZE
+        if self.vel_y > self.tilemap.tile_size:  # 限制最大下落速度，每帧最多落一格
+            self.vel_y = self.tilemap.tile_size
         self.rect.y += self.vel_y
         self.on_ground = False
         self.collide(0, self.vel_y)
 
     def collide(self, dx, dy):
-        # 与所有砖块检测碰撞并修正位置
-        for block in self.blocks:
-            if self.rect.colliderect(block.rect):
+        # 只取玩家所在格子里的砖块检测碰撞并修正位置
+        for block in self.tilemap.collide_rects(self.rect):
+            if self.rect.colliderect(block):
                 if dx > 0:    # 向右撞
-                    self.rect.right = block.rect.left
+                    self.rect.right = block.left
                 if dx < 0:    # 向左撞
-                    self.rect.left = block.rect.right
+                    self.rect.left = block.right
                 if dy > 0:    # 向下撞（落地）
-                    self.rect.bottom = block.rect.top
+                    self.rect.bottom = block.top
                     self.vel_y = 0
                     self.on_ground = True
                 if dy < 0:    # 向上撞（顶头）
-                    self.rect.top = block.rect.bottom
+                    self.rect.top = block.bottom
                     self.vel_y = 0
 
-class Block(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((TILESIZE, TILESIZE))
-        self.image.fill((100, 70, 40))  # 棕色方块代表砖块
-        self.rect = self.image.get_rect()
-        self.rect.topleft = (x, y)
+# —— 关卡文件 —— #
+# 关卡是 levels 目录下的文本文件，由共用的 level.py 加载（格式和编译缓存见该模块）
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels')
+LEVEL_FILE = 'level1.txt'
 
-def main():
-    pygame.init()
+def main(level_file=LEVEL_FILE):
+    pygame.display.init()  # 只初始化用到的显示子系统
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("简易超级玛丽 - Pygame")
     clock = pygame.time.Clock()
 
     # —— 精灵组 —— #
     all_sprites = pygame.sprite.Group()
-    blocks = pygame.sprite.Group()
-
-    # —— 根据地图实例化砖块 & 玩家 —— #
-    player = None
-    for row_idx, row in enumerate(LEVEL_MAP):
-        for col_idx, cell in enumerate(row):
-            x, y = col_idx * TILESIZE, row_idx * TILESIZE
-            if cell == 'X':
-                block = Block(x, y)
-                all_sprites.add(block)
-                blocks.add(block)
-            elif cell == 'P':
-                player = Player(x, y, blocks)
-                all_sprites.add(player)
-
-    # 初始没有显式放置 P，也可手动指定
-    if not player:
-        player = Player(100, HEIGHT - 2 * TILESIZE, blocks)
-        all_sprites.add(player)
-
-    # 视口横向滚动偏移
-    scroll_x = 0
+
+    # 打开关卡文件（有编译缓存时直接读取缓存）
+    # 相对路径先按当前目录找，找不到再到 levels 目录下找
+    if not os.path.exists(level_file):
+        level_file = os.path.join(LEVEL_DIR, level_file)
+    level = open_level(level_file)
+    spawn = level.find_spawn('player')
+
+    # 砖块不会移动，不再为每格创建精灵：绘制和碰撞都交给瓦片地图
+    # 很长的关卡（如 levels/long.txt）只读入视口附近的窗口
+    colors = {'X': (100, 70, 40)}  # 棕色方块代表砖块
+    streaming = level.cols > STREAM_MIN_COLS
+    if streaming:
+        tilemap = StreamingTileMap(level, colors)
+    else:
+        full = level.load()
+        level.close()
+        tilemap = TileMap(full.grid, full.tile_size, colors, full.breakable, full.colliders)
+
+    # —— 根据出生表放置玩家，关卡中没有放置 P 时放在左下角 —— #
+    player = Player(*(spawn or (100, HEIGHT - 2 * level.tile_size)), tilemap)
+    all_sprites.add(player)
+
+    # 视口横向滚动偏移（流式加载时先加载玩家所在的视口）
+    view = pygame.Rect(max(player.rect.x - WIDTH // 3, 0), 0, WIDTH, HEIGHT)
+    if streaming:
+        tilemap.update(view)
 
     # —— 游戏主循环 —— #
     running = True
@@ -129,19 +121,23 @@ def main():
         all_sprites.update()
 
         # 计算滚动：保持玩家始终在窗口左侧三分之一位置
-        scroll_x = player.rect.x - WIDTH // 3
-        if scroll_x < 0:
-            scroll_x = 0
+        view.x = max(player.rect.x - WIDTH // 3, 0)
+        if streaming:
+            tilemap.update(view)
 
         # 绘制
         screen.fill((135, 206, 235))  # 天空蓝背景
+        tilemap.draw(screen, view)
         for sprite in all_sprites:
-            screen.blit(sprite.image, (sprite.rect.x - scroll_x, sprite.rect.y))
+            screen.blit(sprite.image, (sprite.rect.x - view.x, sprite.rect.y))
 
         pygame.display.flip()
 
+    if streaming:
+        tilemap.close()
     pygame.quit()
     sys.exit()
 
 if __name__ == '__main__':
-    main()
+    # 可以在命令行指定关卡文件: python main.py levels/level1.txt
+    main(*sys.argv[1:2])
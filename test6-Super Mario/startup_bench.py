@@ -0,0 +1,101 @@
+# startup_bench.py
+# 超级玛丽各版本的导入/启动基准测试（无需窗口，使用 SDL 的 dummy 驱动）
+# 导入耗时用 python -X importtime 在新进程中测量，同时检查导入后是否有 Pygame 子系统被初始化；
+# 首帧耗时在新进程中以 __main__ 运行游戏，第一次 flip/update 时记录时间并退出
+# 用法: python startup_bench.py [--repeat 5] [版本目录 ...]
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ENV = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+
+# import time:  自身(us) | 累计(us) | 缩进 + 模块名
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+# 导入模块后打印已初始化的 Pygame 子系统，逗号分隔，模块没有导入 Pygame 或没有初始化时为空行
+# （用 __import__ 导入，importlib.import_module 不经过 -X importtime 统计的导入路径）；
+# test4-Snake/snake_bench.py 的 startup 子命令使用同样的探针
+IMPORT_PROBE = '''
+import sys
+__import__(sys.argv[1])
+pygame = sys.modules.get('pygame')
+modules = (('pygame', pygame), ('display', pygame.display), ('font', pygame.font)) if pygame else ()
+print(','.join(name for name, module in modules if module.get_init()))
+'''
+
+# 以 __main__ 运行游戏，第一帧提交到屏幕时打印耗时（毫秒）并立即退出
+FIRST_FRAME_DRIVER = '''
+import os, runpy, sys, time
+start = time.perf_counter()
+import pygame
+def first_frame(*args):
+    print((time.perf_counter() - start) * 1000, flush=True)
+    os._exit(0)
+pygame.display.flip = pygame.display.update = first_frame
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+'''
+
+
+def builds():
+    return sorted(name for name in os.listdir(ROOT)
+                  if os.path.isfile(os.path.join(ROOT, name, 'main.py')))
+
+
+def measure_import(folder, module='main'):
+    # 返回 (模块累计耗时, 其中 pygame 的累计耗时, 导入后已初始化的子系统)，耗时单位为毫秒
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_PROBE, module],
+                            cwd=folder, env=ENV, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            cumulative.setdefault(match.group(4), int(match.group(2)) / 1000)
+    return cumulative.get(module, 0.0), cumulative.get('pygame', 0.0), result.stdout.strip()
+
+
+def measure_first_frame(folder, script='main.py'):
+    # 返回 (子进程内到第一帧的耗时, 包含解释器启动的总耗时)，单位为毫秒
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', FIRST_FRAME_DRIVER, script],
+                            cwd=folder, env=ENV, capture_output=True, text=True, timeout=60)
+    total = (time.perf_counter() - start) * 1000
+    if result.returncode != 0 or not result.stdout.strip():
+        raise RuntimeError("没有画出第一帧")
+    return float(result.stdout.strip().splitlines()[-1]), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="超级玛丽导入/启动基准测试")
+    parser.add_argument("builds", nargs="*", help="要测试的版本目录（默认全部）")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数，取中位数")
+    args = parser.parse_args()
+
+    print(f"导入和启动耗时（毫秒，{args.repeat} 次取中位数）")
+    print(f"{'版本':<16} {'导入':>8} {'其中pygame':>10} {'首帧':>8} {'总耗时':>8}  导入后已初始化")
+    for name in args.builds or builds():
+        folder = os.path.join(ROOT, name)
+        try:
+            imports = [measure_import(folder) for _ in range(args.repeat)]
+            frames = [measure_first_frame(folder) for _ in range(args.repeat)]
+        except (RuntimeError, subprocess.TimeoutExpired) as error:
+            print(f"{name:<16} 失败: {error}")
+            continue
+        module = statistics.median(item[0] for item in imports)
+        pygame_ms = statistics.median(item[1] for item in imports)
+        first = statistics.median(item[0] for item in frames)
+        total = statistics.median(item[1] for item in frames)
+        initialized = imports[-1][2] or "无"
+        print(f"{name:<16} {module:>8.1f} {pygame_ms:>10.1f} {first:>8.1f} {total:>8.1f}  {initialized}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# text.py
+# 各版本共用的文字缓存：字体按字号只加载一次，渲染好的文字表面放进 LRU 缓存，HUD 每帧只需一次 blit
+
+from collections import OrderedDict
+import pygame
+
+class TextCache:
+    # face 为系统字体名，None 表示 Pygame 自带的默认字体
+    def __init__(self, max_entries=128, face=None):
+        self.face = face
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            # 字体模块在第一次渲染文字时才初始化
+            if not pygame.font.get_init():
+                pygame.font.init()
+            # match_font 会扫描系统字体，只在第一次用到时调用
+            path = pygame.font.match_font(self.face) if self.face else None
+            font = pygame.font.Font(path, size)
+            self.fonts[size] = font
+        return font
+
+    def render(self, text, size, color):
+        key = (text, tuple(color), size)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.font(size).render(text, True, color).convert_alpha()
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
@@ -0,0 +1,370 @@
+# tilemap.py
+# 各版本共用的瓦片地图：关卡编译时的瓦片合并、分块缓存绘制的 TileMap 和按列窗口流式加载的 StreamingTileMap
+# 格子大小一律取自关卡（Level.tile_size），不依赖任何版本的常量
+# 用法: python tilemap.py [列数 ...]   生成很长的关卡，测试流式加载的预取和释放
+
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+# 每个区块包含 CHUNK_TILES x CHUNK_TILES 个瓦片
+CHUNK_TILES = 16
+# 区块表面的透明色（瓦片不会用到的颜色）
+CHUNK_COLORKEY = (255, 0, 255)
+# 流式加载：超过这么多列的关卡只加载视口附近的列窗口（每个窗口 CHUNK_TILES 列）
+STREAM_MIN_COLS = 256
+STREAM_AHEAD = 2 # 后台预取前方几个窗口
+STREAM_BEHIND = 1 # 后台预取身后几个窗口
+
+def merge_tiles(grid, solid, breakable=()):
+    # 关卡编译：把相邻的同种实心瓦片贪心合并成尽量大的矩形
+    # 先向右延伸成一行，再整行向下延伸；breakable 中的瓦片保持单格，以便单独移除
+    # 返回 (瓦片字符, 列, 行, 宽, 高) 列表，单位为格
+    rows = len(grid)
+    cols = len(grid[0]) if rows else 0
+    used = [bytearray(cols) for _ in range(rows)]
+    rects = []
+    for row in range(rows):
+        line = grid[row]
+        for col in range(cols):
+            char = line[col]
+            if used[row][col] or char not in solid:
+                continue
+            w = h = 1
+            if char not in breakable:
+                while col + w < cols and line[col + w] == char and not used[row][col + w]:
+                    w += 1
+                while row + h < rows and all(grid[row + h][x] == char and not used[row + h][x]
+                                             for x in range(col, col + w)):
+                    h += 1
+            for y in range(row, row + h):
+                used[y][col:col + w] = b'\x01' * w
+            rects.append((char, col, row, w, h))
+    return rects
+
+class TileMap:
+    # 静态瓦片地图：加载关卡时把瓦片合并成大矩形，碰撞和绘制都以合并后的矩形为单位；
+    # 合并结果预先画到区块表面上，绘制时只 blit 与视口相交的几个区块，
+    # 某个瓦片改变时只重建它所在的区块
+    def __init__(self, level_map, tile_size, tile_colors, breakable=(), merged=None, origin_col=0,
+                 convert=True):
+        # origin_col 为地图左边界所在的世界列（流式加载时每个窗口是一张局部地图）
+        # convert=False 用于后台线程：区块先画在普通表面上，装入后由主线程调用 convert_chunks()
+        self.tile_size = tile_size
+        self.origin_col = origin_col
+        self.origin_x = origin_col * tile_size
+        self.cols = max(len(row) for row in level_map)
+        self.rows = len(level_map)
+        self.grid = [list(row.ljust(self.cols)) for row in level_map]
+        self.chunk_size = CHUNK_TILES * tile_size
+        self.chunk_cols = (self.cols + CHUNK_TILES - 1) // CHUNK_TILES
+        self.chunk_rows = (self.rows + CHUNK_TILES - 1) // CHUNK_TILES
+
+        # tile_colors 中的瓦片都是实心的，参与碰撞
+        self.tile_colors = tile_colors
+        self.solid = set(tile_colors)
+        self.breakable = set(breakable)
+        # merged 为关卡编译时已经算好的合并结果，省去加载时再合并一次
+        self._merge(merged)
+
+        # (cx, cy) -> Surface，整块为空时为 None
+        self.chunks = {}
+        self.dirty = set()
+        for cy in range(self.chunk_rows):
+            for cx in range(self.chunk_cols):
+                self.chunks[(cx, cy)] = self._build_chunk(cx, cy)
+        if convert:
+            self.convert_chunks()
+
+    @property
+    def width(self):
+        return self.cols * self.tile_size
+
+    @property
+    def height(self):
+        return self.rows * self.tile_size
+
+    def _merge(self, merged=None):
+        # colliders[i] 为 (瓦片字符, 世界坐标矩形)；owner[row][col] 为格子所属矩形的下标，空格为 -1
+        size = self.tile_size
+        if merged is None:
+            merged = merge_tiles(self.grid, self.solid, self.breakable)
+        self.colliders = []
+        self.owner = [[-1] * self.cols for _ in range(self.rows)]
+        for char, col, row, w, h in merged:
+            index = len(self.colliders)
+            self.colliders.append((char, pygame.Rect((self.origin_col + col) * size, row * size,
+                                                     w * size, h * size)))
+            for y in range(row, row + h):
+                self.owner[y][col:col + w] = [index] * w
+        self.merge_dirty = False
+
+    def get_tile(self, col, row):
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return self.grid[row][col]
+        return ' '
+
+    def set_tile(self, col, row, char):
+        # 修改瓦片，并把所在区块标记为需要重建
+        old = self.grid[row][col]
+        if old == char:
+            return
+        self.grid[row][col] = char
+        self.dirty.add((col // CHUNK_TILES, row // CHUNK_TILES))
+        if old in self.breakable and char not in self.solid and not self.merge_dirty:
+            # 单格的可破坏瓦片被移除时只需作废它自己的矩形
+            self.colliders[self.owner[row][col]] = None
+            self.owner[row][col] = -1
+        else:
+            self.merge_dirty = True
+
+    def collide_rects(self, rect):
+        # 返回与 rect 重叠的实心矩形：只检查 rect 覆盖的几个格子，与关卡大小无关
+        if self.merge_dirty:
+            self._merge()
+        size = self.tile_size
+        left = rect.left - self.origin_x
+        right = rect.right - self.origin_x
+        hits = []
+        seen = set()
+        for row in range(max(rect.top // size, 0), min((rect.bottom - 1) // size, self.rows - 1) + 1):
+            line = self.owner[row]
+            for col in range(max(left // size, 0), min((right - 1) // size, self.cols - 1) + 1):
+                index = line[col]
+                if index >= 0 and index not in seen:
+                    seen.add(index)
+                    hits.append(self.colliders[index][1])
+        return hits
+
+    def _build_chunk(self, cx, cy):
+        # 区块内的每个合并矩形只需一次 fill
+        size = self.tile_size
+        left, top = cx * CHUNK_TILES, cy * CHUNK_TILES
+        indices = set()
+        for row in range(top, min(top + CHUNK_TILES, self.rows)):
+            indices.update(i for i in self.owner[row][left:left + CHUNK_TILES] if i >= 0)
+        if not indices:
+            return None
+        surface = pygame.Surface((self.chunk_size, self.chunk_size))
+        surface.fill(CHUNK_COLORKEY)
+        origin = (-self.origin_x - left * size, -top * size)
+        bounds = surface.get_rect()
+        for index in indices:
+            char, rect = self.colliders[index]
+            # 矩形可能跨越多个区块，先裁剪到本区块（fill 对负坐标的裁剪不可靠）
+            surface.fill(self.tile_colors[char], rect.move(origin).clip(bounds))
+        return surface
+
+    @staticmethod
+    def _finish_chunk(surface):
+        # 转换成显示格式并设置透明色；convert() 依赖显示表面，只在主线程调用
+        if surface is None:
+            return None
+        surface = surface.convert()
+        surface.set_colorkey(CHUNK_COLORKEY, pygame.RLEACCEL)
+        return surface
+
+    def convert_chunks(self):
+        for key, surface in self.chunks.items():
+            self.chunks[key] = self._finish_chunk(surface)
+
+    def draw(self, surface, view):
+        # view 为摄像机的世界坐标矩形
+        if self.dirty:
+            if self.merge_dirty:
+                self._merge()
+            for key in self.dirty:
+                self.chunks[key] = self._finish_chunk(self._build_chunk(*key))
+            self.dirty.clear()
+
+        size = self.chunk_size
+        x0 = self.origin_x
+        first_cx = max((view.left - x0) // size, 0)
+        last_cx = min((view.right - 1 - x0) // size, self.chunk_cols - 1)
+        first_cy = max(view.top // size, 0)
+        last_cy = min((view.bottom - 1) // size, self.chunk_rows - 1)
+        for cy in range(first_cy, last_cy + 1):
+            for cx in range(first_cx, last_cx + 1):
+                chunk = self.chunks[(cx, cy)]
+                if chunk is not None:
+                    surface.blit(chunk, (x0 + cx * size - view.x, cy * size - view.y))
+
+class StreamingTileMap:
+    # 流式瓦片地图：关卡按 CHUNK_TILES 列切成窗口，只为摄像机附近的窗口建立 TileMap；
+    # 视口前方 ahead 个、身后 behind 个窗口交给后台线程预先构建，超出这个范围再多一个窗口的被释放
+    # level 为 level.open_level() 打开的关卡缓存，窗口的瓦片和出生点用到时才从文件读取，
+    # 所以内存只和屏幕宽度有关，与关卡长度无关；close() 时一并关闭关卡文件
+    def __init__(self, level, tile_colors, ahead=STREAM_AHEAD, behind=STREAM_BEHIND):
+        self.level = level
+        self.tile_size = level.tile_size
+        self.tile_colors = tile_colors
+        self.solid = level.solid
+        self.breakable = level.breakable
+        self.rows = level.rows
+        self.cols = level.cols
+        self.window_size = CHUNK_TILES * self.tile_size
+        self.window_count = level.window_count
+        self.ahead = ahead
+        self.behind = behind
+        self.windows = {}   # 窗口下标 -> TileMap
+        self.pending = {}   # 窗口下标 -> Future
+        # 被修改过的瓦片：窗口下标 -> {(列, 行): 字符}，窗口释放后重新加载时再套用
+        self.edits = {}
+        # 每个窗口是否已经加载过（每个窗口一个字节），出生点只在第一次加载时交给游戏
+        self.visited = bytearray(self.window_count)
+        # 已加载窗口的集合每变化一次加一，游戏据此重建依赖已加载范围的数据
+        self.version = 0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='level-stream')
+        # 统计：在主线程同步构建的窗口数 / 由后台线程预先构建好的窗口数 / 释放的窗口数
+        self.sync_loads = 0
+        self.async_loads = 0
+        self.evictions = 0
+
+    @property
+    def width(self):
+        return self.cols * self.tile_size
+
+    @property
+    def height(self):
+        return self.rows * self.tile_size
+
+    def _build_window(self, index, edits, convert=True):
+        # edits 为主线程交过来的副本，后台线程不直接读 self.edits
+        rows, spawns = self.level.read_window(index)
+        left = index * CHUNK_TILES
+        if edits:
+            rows = [list(row) for row in rows]
+            for (col, row), char in edits.items():
+                rows[row][col - left] = char
+        return TileMap(rows, self.tile_size, self.tile_colors, self.breakable, origin_col=left,
+                       convert=convert), spawns
+
+    def _install(self, index, built, spawned):
+        window, spawns = built
+        self.windows[index] = window
+        self.version += 1
+        if not self.visited[index]:
+            self.visited[index] = 1
+            spawned.extend(spawns)
+
+    def update(self, view):
+        # 每帧调用：保证视口内的窗口已加载，预取前后的窗口，释放远离的窗口
+        # 返回第一次加载的窗口中的出生点 [(类型, x, y)]，供游戏生成其中的敌人
+        first = max(view.left // self.window_size, 0)
+        last = min((view.right - 1) // self.window_size, self.window_count - 1)
+        # 预取 [first - behind, last + ahead]，再往外多留一个窗口，视口在窗口边界来回移动时不会反复加载
+        low, high = first - self.behind - 1, last + self.ahead + 1
+        spawned = []
+        for index, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[index]
+                if index not in self.windows and low <= index <= high:
+                    built = future.result()
+                    built[0].convert_chunks()
+                    self._install(index, built, spawned)
+                    self.async_loads += 1
+        for index in range(first, last + 1):
+            if index not in self.windows:
+                # 预取没赶上，只能在主线程同步构建
+                self.pending.pop(index, None)
+                self._install(index, self._build_window(index, self.edits.get(index)), spawned)
+                self.sync_loads += 1
+        for index in (*range(last + 1, last + self.ahead + 1), *range(first - self.behind, first)):
+            if 0 <= index < self.window_count and index not in self.windows and index not in self.pending:
+                self.pending[index] = self.executor.submit(self._build_window, index,
+                                                           dict(self.edits.get(index, {})), False)
+        for index in [i for i in self.windows if i < low or i > high]:
+            del self.windows[index]
+            self.version += 1
+            self.evictions += 1
+        return spawned
+
+    def loaded_span(self):
+        # 已加载窗口覆盖的世界 x 范围 [left, right)
+        if not self.windows:
+            return 0, 0
+        return min(self.windows) * self.window_size, (max(self.windows) + 1) * self.window_size
+
+    def loaded_grid(self):
+        # 已加载窗口拼成的瓦片网格，返回 (左边界所在的列, 行列表)；中间没加载的窗口填空格
+        if not self.windows:
+            return 0, []
+        first, last = min(self.windows), max(self.windows)
+        blank = [' ' * CHUNK_TILES] * self.rows
+        parts = [[''.join(line) for line in self.windows[index].grid] if index in self.windows else blank
+                 for index in range(first, last + 1)]
+        return first * CHUNK_TILES, [''.join(part[row] for part in parts) for row in range(self.rows)]
+
+    def get_tile(self, col, row):
+        # 未加载的窗口视为空
+        window = self.windows.get(col // CHUNK_TILES)
+        if window is None:
+            return ' '
+        return window.get_tile(col - window.origin_col, row)
+
+    def set_tile(self, col, row, char):
+        index = col // CHUNK_TILES
+        self.edits.setdefault(index, {})[(col, row)] = char
+        # 后台线程可能基于旧的瓦片构建了这个窗口，丢弃它
+        self.pending.pop(index, None)
+        window = self.windows.get(index)
+        if window is not None:
+            window.set_tile(col - window.origin_col, row, char)
+
+    def collide_rects(self, rect):
+        # 未加载的窗口视为空
+        hits = []
+        for index in range(max(rect.left // self.window_size, 0), (rect.right - 1) // self.window_size + 1):
+            window = self.windows.get(index)
+            if window is not None:
+                hits.extend(window.collide_rects(rect))
+        return hits
+
+    def draw(self, surface, view):
+        for index in range(max(view.left // self.window_size, 0), (view.right - 1) // self.window_size + 1):
+            window = self.windows.get(index)
+            if window is not None:
+                window.draw(surface, view)
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.level.close()
+
+if __name__ == '__main__':
+    # 生成不同长度的关卡，让视口从头滚到尾再滚回来，检查窗口的预取和释放：
+    # 常驻的窗口数和内存峰值不应随关卡长度增长
+    import itertools
+    import os
+    import sys
+    import tempfile
+    import time
+    import tracemalloc
+    from level import generate_level, open_level
+    pygame.display.init()
+    pygame.display.set_mode((1, 1), pygame.HIDDEN) # convert() 需要显示表面
+    counts = [int(arg) for arg in sys.argv[1:]] or [1024, 8192]
+    for cols in counts:
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'long.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(generate_level(cols, 'P'))
+            open_level(path).close() # 先编译好缓存，编译不计入测量
+            tilemap = StreamingTileMap(open_level(path), {'P': (139, 69, 19)})
+            tracemalloc.start()
+            view = pygame.Rect(0, 0, 800, 600)
+            end = tilemap.width - view.width
+            resident = frames = 0
+            elapsed = 0.0
+            for x in itertools.chain(range(0, end, 64), range(end, -1, -64)):
+                view.x = x
+                start = time.perf_counter()
+                tilemap.update(view)
+                elapsed += time.perf_counter() - start
+                resident = max(resident, len(tilemap.windows))
+                frames += 1
+                time.sleep(0.001) # 留给后台线程的时间，相当于一帧里的其它工作
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            tilemap.close()
+        print(f"{cols:>6} 列: {frames} 帧, 常驻窗口最多 {resident} 个, 同步加载 {tilemap.sync_loads}, "
+              f"后台加载 {tilemap.async_loads}, 释放 {tilemap.evictions}, "
+              f"update {elapsed / frames * 1000:.3f} ms/帧, Python 内存峰值 {peak / 1024:.0f} KB")